@@ -0,0 +1,57 @@
+"""
+Work that waits for a session to commit.
+
+In-process caches and indexes follow the database, so they should take in a
+change once its transaction commits and never one that rolls back. A write
+notes what it changed on its session under a name; the handler registered for
+that name gets the note once the session commits, and a rollback discards it.
+One pair of session listeners serves every name:
+
+    @on_commit("changed_user_ids")
+    def _invalidate_committed_users(user_ids):
+        ...
+
+    pending(session, "changed_user_ids", set).add(user.id)
+
+A cache that drops an entry as soon as the change is flushed still has to
+drop it again here: a request reading before the commit can cache the old row
+in between. Handlers run in the committing thread, in registration order.
+"""
+from typing import Any, Callable, Dict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+Handler = Callable[[Any], None]
+
+_handlers: Dict[str, Handler] = {}
+
+
+def on_commit(name: str) -> Callable[[Handler], Handler]:
+    """Register the handler for what sessions note under `name`"""
+    def register(handler: Handler) -> Handler:
+        _handlers[name] = handler
+        return handler
+    return register
+
+
+def pending(session: Session, name: str, factory: Callable[[], Any]) -> Any:
+    """What `session` has noted under `name` so far, created with `factory` on first use"""
+    value = session.info.get(name)
+    if value is None:
+        value = session.info[name] = factory()
+    return value
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed(session):
+    for name, handler in _handlers.items():
+        value = session.info.pop(name, None)
+        if value is not None:
+            handler(value)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session):
+    for name in _handlers:
+        session.info.pop(name, None)
@@ -5,11 +5,73 @@ from typing import Optional
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = "sqlite:///./airline.db"
+    ASYNC_DATABASE_URL: Optional[str] = None  # Defaults to DATABASE_URL with the aiosqlite driver
     
     # JWT
     SECRET_KEY: str = "your-secret-key-change-in-production-use-env-variable"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+
+    # Cache of authenticated users, keyed by token subject
+    USER_CACHE_TTL_SECONDS: float = 60
+    USER_CACHE_MAX_SIZE: int = 10_000
+
+    # bcrypt worker pool; requests beyond workers + queue get a 503
+    PASSWORD_HASH_WORKERS: Optional[int] = None  # Defaults to half the CPU cores, at least one
+    PASSWORD_HASH_MAX_QUEUE: int = 32
+    PASSWORD_HASH_RETRY_AFTER_SECONDS: int = 1
+
+    # List endpoints (keyset pagination)
+    DEFAULT_PAGE_SIZE: int = 50
+    MAX_PAGE_SIZE: int = 200
+
+    # Re-runs of a booking change after a concurrent write to the same flight's seats
+    INVENTORY_CONFLICT_RETRIES: int = 10
+
+    # Background release of expired seat holds; an interval of 0 disables it
+    HOLD_SWEEP_INTERVAL_SECONDS: float = 30
+    HOLD_SWEEP_BATCH_SIZE: int = 500
+
+    # Answer flight searches from an in-memory index loaded at startup
+    FLIGHT_SEARCH_INDEX: bool = True
+
+    # Per-route availability calendars; entries are also dropped on flight and booking changes
+    CALENDAR_CACHE_TTL_SECONDS: float = 300
+    CALENDAR_CACHE_MAX_SIZE: int = 10_000
+    CALENDAR_MAX_DAYS: int = 31
+
+    # Cached flight search pages and flight details; writes to a flight or route move its version
+    RESPONSE_CACHE_TTL_SECONDS: float = 30
+    RESPONSE_CACHE_MAX_SIZE: int = 10_000
+
+    # Concurrent identical flight detail and seat map reads share one computation
+    REQUEST_COALESCING: bool = True
+
+    # Server-Sent Events stream of announcements
+    ANNOUNCEMENT_HEARTBEAT_SECONDS: float = 15
+    ANNOUNCEMENT_STREAM_QUEUE_SIZE: int = 100
+    ANNOUNCEMENT_RETRY_MILLISECONDS: int = 3000
+
+    # Background delivery of announcements into passenger inboxes, in batches of passengers
+    INBOX_FANOUT_BATCH_SIZE: int = 500
+    INBOX_FANOUT_RETRY_SECONDS: float = 5
+
+    # Flight, booking and payment change events; the outbox also writes them to change_outbox
+    CHANGE_OUTBOX: bool = False
+    # Announcements raised by flight updates (gate, delay, boarding, cancellation)
+    AUTO_ANNOUNCEMENTS: bool = True
+    DELAY_ANNOUNCEMENT_MINUTES: int = 15
+
+    # In-memory connection search graph, loaded at startup; defaults for itinerary searches
+    CONNECTION_SEARCH: bool = True
+    CONNECTION_MIN_MINUTES: int = 45
+    CONNECTION_MAX_MINUTES: int = 360
+    CONNECTION_MAX_LEGS: int = 3
+
+    # ETags on flight, seat map, trip and announcement reads; versions are per process.
+    # Trip lists and announcements depend on the clock, so their ETags also change every bucket
+    CONDITIONAL_REQUESTS: bool = True
+    ETAG_TIME_BUCKET_SECONDS: int = 60
     
     # Application
     PROJECT_NAME: str = "Airline Booking & Operations System"
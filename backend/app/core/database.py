@@ -1,16 +1,45 @@
+from datetime import datetime, timezone
+from typing import Optional
+
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import settings
 
+
+def _async_database_url() -> str:
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    if settings.DATABASE_URL.startswith("sqlite:"):
+        return settings.DATABASE_URL.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    return settings.DATABASE_URL
+
+
+# Sync engine, used by scripts such as seed_data.py
 engine = create_engine(
     settings.DATABASE_URL, connect_args={"check_same_thread": False}
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine, used by the API. aiosqlite defaults to NullPool, which opens a
+# connection (and a thread) per session, so pool connections explicitly.
+async_engine = create_async_engine(_async_database_url(), poolclass=AsyncAdaptedQueuePool)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 Base = declarative_base()
 
 
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """A datetime as the database stores it: naive UTC. SQLite drops the offset of an aware value"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
 def get_db():
     db = SessionLocal()
     try:
@@ -18,3 +47,7 @@ def get_db():
     finally:
         db.close()
 
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,16 +1,47 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached, object_session
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.commit_hooks import on_commit, pending
+from app.core.config import settings
+from app.core.database import get_async_db
 from app.core.security import decode_access_token
 from app.models.user import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/auth/login")
 
+# Token subject (user id) -> detached User holding only column values
+user_cache = TTLCache(maxsize=settings.USER_CACHE_MAX_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
+metrics.register("user_cache", user_cache.stats)
 
-def get_current_user(
+
+def _detached_copy(user: User) -> User:
+    copy = User(**{column.key: getattr(user, column.key) for column in User.__table__.columns})
+    make_transient_to_detached(copy)
+    return copy
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    user_cache.invalidate(target.id)
+    session = object_session(target)
+    if session is not None:
+        pending(session, "changed_user_ids", set).add(target.id)
+
+
+@on_commit("changed_user_ids")
+def _invalidate_committed_users(user_ids):
+    for user_id in user_ids:
+        user_cache.invalidate(user_id)
+
+
+async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -22,18 +53,31 @@ def get_current_user(
     if payload is None:
         raise credentials_exception
     
-    user_id: int = payload.get("sub")
-    if user_id is None:
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
+    try:
+        user_id = int(payload.get("sub"))
+    except (TypeError, ValueError):
         raise credentials_exception
-    
+
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        # Attach a per-request copy without going back to the database
+        user = await db.merge(cached, load=False)
+    else:
+        user = await db.get(User, user_id)
+        if user is None:
+            raise credentials_exception
+        user_cache.set(user_id, _detached_copy(user))
+
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User account is inactive"
+        )
+
     return user
 
 
-def get_current_passenger(
+async def get_current_passenger(
     current_user: User = Depends(get_current_user)
 ) -> User:
     if current_user.role != "passenger":
@@ -44,7 +88,7 @@ def get_current_passenger(
     return current_user
 
 
-def get_current_staff(
+async def get_current_staff(
     current_user: User = Depends(get_current_user)
 ) -> User:
     if current_user.role != "staff":
@@ -0,0 +1,64 @@
+"""
+Conditional GET support.
+
+Read endpoints derive a strong ETag from the versions of the resources they
+render (see `app.services.resource_versions`) plus the request path and query,
+before running any query. A request whose `If-None-Match` carries that ETag is
+answered with `304 Not Modified` and no body. Responses are marked
+`private, no-cache`: clients may keep them but must revalidate every time.
+
+ETags include a token chosen at process start, since versions are kept in
+memory and restart from zero.
+"""
+import hashlib
+import secrets
+import time
+from typing import Optional
+
+from fastapi import Request, Response, status
+from app.core import metrics
+from app.core.config import settings
+
+CACHE_CONTROL = "private, no-cache"
+
+_process_token = secrets.token_hex(4)
+_counts = {"checked": 0, "not_modified": 0}
+metrics.register("conditional_requests", lambda: dict(_counts))
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.blake2b(repr((_process_token, *parts)).encode(), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+def time_bucket() -> int:
+    """Changes every ETAG_TIME_BUCKET_SECONDS; part of ETags of responses that depend on the clock"""
+    return int(time.time() // settings.ETAG_TIME_BUCKET_SECONDS)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header value matches `etag` (weak comparison)"""
+    if not if_none_match:
+        return False
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(","))
+
+
+def conditional(request: Request, response: Response, *parts) -> Optional[Response]:
+    """Set ETag and Cache-Control on `response`; a 304 response if the client's copy is current
+
+    `parts` must identify everything the response depends on besides the
+    request path and query, e.g. resource versions and the current user.
+    """
+    if not settings.CONDITIONAL_REQUESTS:
+        return None
+    etag = make_etag(request.url.path, str(request.query_params), *parts)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    _counts["checked"] += 1
+    if not etag_matches(request.headers.get("if-none-match"), etag):
+        return None
+    _counts["not_modified"] += 1
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if "vary" in response.headers:
+        headers["Vary"] = response.headers["vary"]
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
@@ -0,0 +1,17 @@
+"""
+Process-local metrics.
+
+Components register a function returning a dict of their current counters;
+`GET /metrics` returns a snapshot of all of them keyed by name.
+"""
+from typing import Callable, Dict
+
+_collectors: Dict[str, Callable[[], dict]] = {}
+
+
+def register(name: str, collector: Callable[[], dict]) -> None:
+    _collectors[name] = collector
+
+
+def snapshot() -> dict:
+    return {name: collector() for name, collector in _collectors.items()}
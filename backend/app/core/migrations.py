@@ -0,0 +1,122 @@
+"""
+Versioned schema upgrades.
+
+`Base.metadata.create_all` only creates missing tables, so anything added to an
+existing table (indexes, columns) needs an explicit upgrade step. The applied
+version is kept in SQLite's `PRAGMA user_version`; each step runs once, in order,
+inside a single transaction.
+"""
+from sqlalchemy.engine import Connection, Engine
+from app.core.database import Base
+
+
+def _create_indexes(conn: Connection, table_name: str, *index_names: str) -> None:
+    table = Base.metadata.tables[table_name]
+    for index in table.indexes:
+        if index.name in index_names:
+            index.create(bind=conn, checkfirst=True)
+
+
+def _add_column(conn: Connection, table_name: str, column_name: str) -> None:
+    existing = {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table_name})")}
+    if column_name in existing:
+        return
+    column = Base.metadata.tables[table_name].columns[column_name]
+    ddl = f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column.type.compile(conn.dialect)}"
+    if not column.nullable:
+        ddl += " NOT NULL"
+    if column.server_default is not None:
+        ddl += f" DEFAULT {column.server_default.arg}"
+    conn.exec_driver_sql(ddl)
+
+
+def _add_hot_path_indexes(conn: Connection) -> None:
+    _create_indexes(conn, "bookings",
+                    "ix_bookings_flight_id_status",
+                    "ix_bookings_user_id",
+                    "ix_bookings_status_seat_hold_expires_at")
+    _create_indexes(conn, "tickets", "ix_tickets_booking_id")
+    _create_indexes(conn, "announcements", "ix_announcements_flight_id_created_at")
+    _create_indexes(conn, "flights", "ix_flights_route_departure")
+
+
+def _add_seat_inventory_version(conn: Connection) -> None:
+    _add_column(conn, "seat_inventories", "version")
+
+
+def _add_flight_seat_counters(conn: Connection) -> None:
+    from app.services.seat_counters import reset_seat_counters
+
+    for column_name in ("seats_held", "seats_booked", "seats_available"):
+        _add_column(conn, "flights", column_name)
+    reset_seat_counters(conn)
+
+
+def _add_announcement_feed_index(conn: Connection) -> None:
+    # Added for since-id feed polls; those read the inbox since step 5, and the
+    # index serves the announcement stream's resume from Last-Event-ID
+    _create_indexes(conn, "announcements", "ix_announcements_flight_id_id")
+
+
+def _add_announcement_inbox(conn: Connection) -> None:
+    from app.services.announcement_inbox import fill_inbox
+
+    Base.metadata.tables["announcement_inbox"].create(bind=conn, checkfirst=True)
+    _add_column(conn, "announcements", "fanned_out_at")
+    _create_indexes(conn, "announcements", "ix_announcements_pending_fan_out")
+    fill_inbox(conn)
+
+
+def _add_change_outbox(conn: Connection) -> None:
+    Base.metadata.tables["change_outbox"].create(bind=conn, checkfirst=True)
+
+
+def _order_inbox_by_delivery(conn: Connection) -> None:
+    existing = {row[1] for row in conn.exec_driver_sql("PRAGMA table_info(announcement_inbox)")}
+    if "id" in existing:
+        return
+    # SQLite cannot change a primary key in place, so the table is rebuilt
+    conn.exec_driver_sql("ALTER TABLE announcement_inbox RENAME TO announcement_inbox_old")
+    Base.metadata.tables["announcement_inbox"].create(bind=conn)
+    conn.exec_driver_sql(
+        "INSERT INTO announcement_inbox (user_id, announcement_id, delivered_at, read_at) "
+        "SELECT old.user_id, old.announcement_id, COALESCE(announcements.fanned_out_at, announcements.created_at), "
+        "old.read_at FROM announcement_inbox_old AS old "
+        "JOIN announcements ON announcements.id = old.announcement_id "
+        "ORDER BY old.announcement_id, old.user_id"
+    )
+    conn.exec_driver_sql("DROP TABLE announcement_inbox_old")
+
+
+# (version, description, upgrade function); append only, never renumber
+MIGRATIONS = [
+    (1, "Indexes for booking, ticket, announcement and flight search filters", _add_hot_path_indexes),
+    (2, "Optimistic version column on seat inventories", _add_seat_inventory_version),
+    (3, "Held, booked and available seat counters on flights", _add_flight_seat_counters),
+    (4, "Announcement index for stream resumes (first added for since-id polls)", _add_announcement_feed_index),
+    (5, "Per-passenger announcement inbox, filled from existing bookings", _add_announcement_inbox),
+    (6, "Outbox of flight, booking and payment change events", _add_change_outbox),
+    (7, "Inbox entries keyed and ordered by delivery", _order_inbox_by_delivery),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn: Connection) -> int:
+    return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def upgrade_schema(engine: Engine) -> int:
+    """Apply pending upgrade steps and return the resulting schema version"""
+    # Make sure every model is registered on Base.metadata
+    import app.models  # noqa: F401
+
+    with engine.begin() as conn:
+        current = get_schema_version(conn)
+        for version, description, upgrade in MIGRATIONS:
+            if version <= current:
+                continue
+            upgrade(conn)
+            conn.exec_driver_sql(f"PRAGMA user_version = {version}")
+            current = version
+    return current
@@ -0,0 +1,144 @@
+"""
+Keyset (cursor) pagination for list endpoints.
+
+Every list is returned in a fixed order ending in a unique column, so the
+last row of a page identifies where the next one starts. The cursor handed
+to clients is that row's sort key, JSON encoded and base64'd; clients should
+treat it as opaque. List bodies stay plain JSON arrays; the cursor for the
+next page travels in the `X-Next-Cursor` response header and is absent on the
+last page.
+"""
+import base64
+import heapq
+import json
+from bisect import bisect_right
+from datetime import datetime
+from typing import Callable, List, NamedTuple, Optional, Sequence
+
+from fastapi import HTTPException, Query, Response, status
+from sqlalchemy import DateTime, Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Query as ORMQuery
+from app.core.config import settings
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class PageParams(NamedTuple):
+    cursor: Optional[str]
+    limit: int
+
+
+class Page(NamedTuple):
+    items: list
+    next_cursor: Optional[str]
+
+
+def page_params(
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, description="Page size; capped at MAX_PAGE_SIZE"),
+) -> PageParams:
+    """Dependency for list endpoints"""
+    return PageParams(cursor, min(limit, settings.MAX_PAGE_SIZE))
+
+
+def set_next_cursor(response: Response, page: Page) -> list:
+    """Put the next-page cursor on the response and return the page's items"""
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    return page.items
+
+
+def encode_cursor(values: Sequence) -> str:
+    encoded = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(encoded).encode()).decode().rstrip("=")
+
+
+def _cursor_value(column, value):
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    # JSON has one number type, so a float column also takes an int; bool is never a number here
+    expected = (int, float) if python_type is float else python_type
+    if isinstance(value, bool) or not isinstance(value, expected):
+        raise TypeError(f"{value!r} is not a {python_type.__name__}")
+    return value
+
+
+def decode_cursor(cursor: str, columns: Sequence) -> list:
+    invalid = HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise invalid
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise invalid
+    try:
+        return [_cursor_value(column, value) for column, value in zip(columns, values)]
+    except (TypeError, ValueError):
+        raise invalid
+
+
+def _keyset(query, columns: Sequence, params: PageParams, descending: bool):
+    # Works on both legacy Query objects and select() statements
+    key = tuple_(*columns)
+    if params.cursor:
+        after = tuple_(*decode_cursor(params.cursor, columns))
+        query = query.filter(key < after if descending else key > after)
+    order = [column.desc() if descending else column.asc() for column in columns]
+    # Select the sort key alongside each entity, whatever table it comes from
+    return query.add_columns(*columns).order_by(*order).limit(params.limit + 1)
+
+
+def _rows_to_page(rows: Sequence, limit: int) -> Page:
+    page = _page(rows, limit, lambda row: row[1:])
+    return Page([row[0] for row in page.items], page.next_cursor)
+
+
+def paginate(query: ORMQuery, columns: Sequence, params: PageParams, descending: bool = False) -> Page:
+    """One page of the entities of `query`, ordered by `columns`; the last column must be unique
+
+    DateTime sort columns must hold values written through the ORM, which
+    SQLite stores as text with microseconds; server-default timestamps lack
+    them and do not compare correctly against a cursor.
+    """
+    return _rows_to_page(_keyset(query, columns, params, descending).all(), params.limit)
+
+
+async def paginate_async(db: AsyncSession, statement: Select, columns: Sequence, params: PageParams,
+                         descending: bool = False) -> Page:
+    """Same as `paginate` for a select() statement"""
+    result = await db.execute(_keyset(statement, columns, params, descending))
+    return _rows_to_page(result.all(), params.limit)
+
+
+def paginate_list(items: List, sort_key: Callable, columns: Sequence, params: PageParams) -> Page:
+    """Same as `paginate` for a list already sorted (ascending) by `sort_key`"""
+    start = 0
+    if params.cursor:
+        after = tuple(decode_cursor(params.cursor, columns))
+        start = bisect_right(items, after, key=lambda item: tuple(sort_key(item)))
+    return _page(items[start:start + params.limit + 1], params.limit, sort_key)
+
+
+def paginate_top(items: List, sort_key: Callable, columns: Sequence, params: PageParams,
+                 descending: bool = False) -> Page:
+    """Same as `paginate_list` for unsorted items; only the top `limit` + 1 past the cursor are sorted"""
+    def key(item):
+        return tuple(sort_key(item))
+
+    if params.cursor:
+        after = tuple(decode_cursor(params.cursor, columns))
+        items = [item for item in items if (key(item) < after if descending else key(item) > after)]
+    top = heapq.nlargest if descending else heapq.nsmallest
+    return _page(top(params.limit + 1, items, key=key), params.limit, sort_key)
+
+
+def _page(rows: Sequence, limit: int, sort_key: Callable) -> Page:
+    if len(rows) <= limit:
+        return Page(list(rows), None)
+    rows = list(rows[:limit])
+    return Page(rows, encode_cursor(sort_key(rows[-1])))
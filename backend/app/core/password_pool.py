@@ -0,0 +1,118 @@
+"""
+Dedicated worker pool for bcrypt.
+
+Hashing and verifying passwords is deliberately slow. Running it on the shared
+threadpool lets a burst of logins occupy every worker and stall cheap
+endpoints, so bcrypt gets its own small executor instead. Work beyond the
+workers waits in a bounded queue; once that is full, callers get an immediate
+503 with a Retry-After hint rather than piling up behind the backlog.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from fastapi import HTTPException, status
+from app.core import metrics
+from app.core.config import settings
+from app.core.security import verify_password, get_password_hash
+
+
+def _lower_thread_priority() -> None:
+    # On Linux nice values apply per thread, so request handling wins the CPU over bcrypt
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)
+    except (AttributeError, OSError):
+        pass
+
+
+class PasswordPool:
+    def __init__(self, workers: int, max_queue: int, retry_after: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._executor = None  # Started on first use, so shutdown() is not final
+        self._lock = threading.Lock()
+        self._in_flight = 0  # running plus queued
+        self._latencies = deque(maxlen=1000)  # seconds, most recent jobs
+        self.completed = 0
+        self.rejected = 0
+
+    def _timed(self, fn: Callable, *args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._latencies.append(time.perf_counter() - started)
+                self.completed += 1
+
+    async def run(self, fn: Callable, *args):
+        with self._lock:
+            if self._in_flight >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many authentication requests, please retry shortly",
+                    headers={"Retry-After": str(self.retry_after)},
+                )
+            self._in_flight += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="bcrypt", initializer=_lower_thread_priority
+                )
+            executor = self._executor
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, self._timed, fn, *args)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            in_flight = self._in_flight
+            completed, rejected = self.completed, self.rejected
+
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 1)
+
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "queue_length": max(0, in_flight - self.workers),
+            "in_flight": in_flight,
+            "completed": completed,
+            "rejected": rejected,
+            "latency_p50_ms": percentile(0.5),
+            "latency_p99_ms": percentile(0.99),
+        }
+
+
+password_pool = PasswordPool(
+    # bcrypt is CPU bound; leave cores free for everything else
+    workers=settings.PASSWORD_HASH_WORKERS or max(1, (os.cpu_count() or 2) // 2),
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+    retry_after=settings.PASSWORD_HASH_RETRY_AFTER_SECONDS,
+)
+metrics.register("password_pool", password_pool.stats)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_pool.run(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_pool.run(get_password_hash, password)
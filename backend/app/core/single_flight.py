@@ -0,0 +1,61 @@
+"""
+Request coalescing ("single flight").
+
+Concurrent identical reads share one computation: the first caller for a key
+(the leader) runs it, and callers arriving while it runs wait for its result
+(or its exception) instead of running the same queries again. Nothing is kept
+once the computation finishes; caching is left to the caller.
+
+Each caller passes its own function, bound to its own session, and the leader
+runs its function in its own request. If the leader is cancelled (e.g. its
+client went away), waiting callers run their own function instead of failing.
+Coalescing is per event loop, so only callers on the same loop share work.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+# Outcomes handed from a leader to the callers waiting on it
+_RESULT, _ERROR, _CANCELLED = range(3)
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0
+        self.collapsed = 0
+
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Result of `fn()`, shared with concurrent callers passing the same key"""
+        call = self._calls.get(key)
+        while call is not None:
+            outcome, value = await asyncio.shield(call)
+            if outcome == _RESULT:
+                self.collapsed += 1
+                return value
+            if outcome == _ERROR:
+                self.collapsed += 1
+                raise value
+            # The leader was cancelled; join a newer call or lead one
+            call = self._calls.get(key)
+
+        call = asyncio.get_running_loop().create_future()
+        self._calls[key] = call
+        self.leaders += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            call.set_result((_CANCELLED, None))
+            raise
+        except BaseException as exc:
+            call.set_result((_ERROR, exc))
+            raise
+        else:
+            call.set_result((_RESULT, result))
+            return result
+        finally:
+            del self._calls[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"leaders": self.leaders, "collapsed": self.collapsed, "in_flight": len(self._calls)}
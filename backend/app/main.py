@@ -1,16 +1,58 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from app.core import metrics
 from app.core.config import settings
-from app.core.database import engine, Base
+from app.core.database import engine, async_engine, Base, SessionLocal
+from app.core.migrations import upgrade_schema
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.password_pool import password_pool
 from app.routers import auth, passenger, staff
+from app.services.airport_index import airport_index
+from app.services.announcement_inbox import inbox_fanout, inbox_marks
+from app.services.connection_search import connection_graph
+from app.services.flight_announcements import flight_announcer
+from app.services.flight_search_index import flight_search_index
+from app.services.hold_sweeper import hold_sweeper
+from app.services.seat_inventory import backfill_inventories
 
-# Create database tables
+# Create database tables and bring existing ones up to the current schema version
 Base.metadata.create_all(bind=engine)
+upgrade_schema(engine)
+
+# Build seat inventories for flights created before the inventory table existed
+with SessionLocal() as db:
+    backfill_inventories(db)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    with SessionLocal() as db:
+        airport_index.load(db)
+        inbox_marks.load(db)
+    if settings.FLIGHT_SEARCH_INDEX:
+        with SessionLocal() as db:
+            flight_search_index.load(db)
+    if settings.CONNECTION_SEARCH:
+        with SessionLocal() as db:
+            connection_graph.load(db)
+    hold_sweeper.start()
+    inbox_fanout.start()
+    flight_announcer.start()
+    yield
+    await flight_announcer.stop()
+    await inbox_fanout.stop()
+    await hold_sweeper.stop()
+    password_pool.shutdown()
+    # Pooled aiosqlite connections keep their worker threads alive until closed
+    await async_engine.dispose()
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description="Airline Booking & Operations System API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -20,6 +62,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Include routers
@@ -42,6 +85,12 @@ def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics")
+def get_metrics():
+    """In-process cache and worker counters"""
+    return metrics.snapshot()
+
+
 @app.get("/favicon.ico")
 def favicon():
     """Handle favicon requests to avoid 404 errors"""
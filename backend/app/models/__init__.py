@@ -8,6 +8,9 @@ from app.models.ticket import Ticket
 from app.models.payment import Payment
 from app.models.checkin import CheckIn
 from app.models.announcement import Announcement
+from app.models.announcement_inbox import InboxEntry
+from app.models.seat_inventory import SeatInventory
+from app.models.change_outbox import OutboxEvent
 
 __all__ = [
     "User",
@@ -20,5 +23,8 @@ __all__ = [
     "Payment",
     "CheckIn",
     "Announcement",
+    "InboxEntry",
+    "SeatInventory",
+    "OutboxEvent",
 ]
 
@@ -9,7 +9,7 @@ class Airplane(Base):
     id = Column(Integer, primary_key=True, index=True)
     model = Column(String, nullable=False)
     registration_number = Column(String, unique=True, nullable=False)
-    seat_template = Column(JSON, nullable=False)  # e.g., {"rows": 30, "seats_per_row": 6, "layout": "3-3"}
+    seat_template = Column(JSON, nullable=False)  # e.g., {"rows": 30, "seats_per_row": 6, "layout": "3-3"}; see services/seat_template.py
     total_seats = Column(Integer, nullable=False)
     
     # Relationships
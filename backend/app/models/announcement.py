@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from app.core.database import Base
 import enum
 
@@ -20,7 +20,16 @@ class Announcement(Base):
     announcement_type = Column(SQLEnum(AnnouncementType), nullable=False)
     message = Column(String, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    fanned_out_at = Column(DateTime)  # Set once every passenger's inbox has it
     
     # Relationships
     flight = relationship("Flight", back_populates="announcements")
 
+    __table_args__ = (
+        Index("ix_announcements_flight_id_created_at", "flight_id", "created_at"),
+        # Announcements a reconnecting stream missed (flight_id IN ... AND id > Last-Event-ID)
+        Index("ix_announcements_flight_id_id", "flight_id", "id"),
+        # Only announcements still waiting for their fan-out, found at startup
+        Index("ix_announcements_pending_fan_out", "id", sqlite_where=text("fanned_out_at IS NULL")),
+    )
+
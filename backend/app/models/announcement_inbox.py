@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from app.core.database import Base
+
+
+class InboxEntry(Base):
+    """An announcement delivered to a passenger; written by the fan-out, not per request"""
+    __tablename__ = "announcement_inbox"
+
+    id = Column(Integer, primary_key=True)  # Delivery order; the feed's cursor and `since`
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    announcement_id = Column(Integer, ForeignKey("announcements.id"), nullable=False)
+    delivered_at = Column(DateTime, nullable=False)
+    read_at = Column(DateTime)
+
+    # Relationships
+    announcement = relationship("Announcement")
+
+    __table_args__ = (
+        # One entry per passenger and announcement; repeated deliveries are skipped
+        Index("ix_announcement_inbox_user_id_announcement_id", "user_id", "announcement_id", unique=True),
+        # A passenger's entries newest delivery first, the range the feed reads
+        Index("ix_announcement_inbox_user_id_id", "user_id", "id"),
+    )
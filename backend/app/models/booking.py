@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -16,7 +16,7 @@ class Booking(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     pnr = Column(String, unique=True, nullable=False, index=True)  # Passenger Name Record
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     flight_id = Column(Integer, ForeignKey("flights.id"), nullable=False)
     status = Column(SQLEnum(BookingStatus), default=BookingStatus.CREATED)
     seat_hold_expires_at = Column(DateTime)  # 10 minutes hold
@@ -28,3 +28,8 @@ class Booking(Base):
     tickets = relationship("Ticket", back_populates="booking")
     payment = relationship("Payment", back_populates="booking", uselist=False)
 
+    __table_args__ = (
+        Index("ix_bookings_flight_id_status", "flight_id", "status"),
+        Index("ix_bookings_status_seat_hold_expires_at", "status", "seat_hold_expires_at"),
+    )
+
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class OutboxEvent(Base):
+    """A flight, booking or payment change, written in the transaction that made it (CHANGE_OUTBOX)"""
+    __tablename__ = "change_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)  # Commit order of the changes
+    entity = Column(String, nullable=False)  # Table name of the changed row
+    entity_id = Column(Integer, nullable=False)
+    action = Column(String, nullable=False)  # created, updated or deleted
+    changes = Column(JSON, nullable=False)  # Column -> [old, new]
+    row = Column(JSON, nullable=False)  # Column values known after the change
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
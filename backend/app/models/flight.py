@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -28,6 +28,10 @@ class Flight(Base):
     terminal = Column(String)
     status = Column(SQLEnum(FlightStatus), default=FlightStatus.SCHEDULED)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Ticket counts kept in step with bookings by services/seat_counters.py
+    seats_held = Column(Integer, nullable=False, server_default="0")  # Tickets of CREATED bookings
+    seats_booked = Column(Integer, nullable=False, server_default="0")  # Tickets of CONFIRMED bookings
+    seats_available = Column(Integer, nullable=False, server_default="0")  # Bookable seats minus the two above
     
     # Relationships
     origin_airport = relationship("Airport", foreign_keys=[origin_id], back_populates="origin_flights")
@@ -35,4 +39,9 @@ class Flight(Base):
     airplane = relationship("Airplane", back_populates="flights")
     bookings = relationship("Booking", back_populates="flight")
     announcements = relationship("Announcement", back_populates="flight")
+    seat_inventory = relationship("SeatInventory", back_populates="flight", uselist=False)
+
+    __table_args__ = (
+        Index("ix_flights_route_departure", "origin_id", "destination_id", "scheduled_departure"),
+    )
 
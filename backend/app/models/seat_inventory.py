@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, LargeBinary, ForeignKey
+from sqlalchemy.orm import relationship
+from app.core.database import Base
+
+
+class SeatInventory(Base):
+    __tablename__ = "seat_inventories"
+
+    flight_id = Column(Integer, ForeignKey("flights.id"), primary_key=True)
+    seat_count = Column(Integer, nullable=False)  # Number of seats the bitmap covers
+    bitmap = Column(LargeBinary, nullable=False)  # One bit per seat, row-major over the seat template
+    # Bumped on every write; an UPDATE from a stale read matches no row and raises StaleDataError
+    version = Column(Integer, nullable=False, server_default="1")
+    
+    # Relationships
+    flight = relationship("Flight", back_populates="seat_inventory")
+
+    __mapper_args__ = {"version_id_col": version}
@@ -8,7 +8,7 @@ class Ticket(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     ticket_number = Column(String, unique=True, nullable=False, index=True)
-    booking_id = Column(Integer, ForeignKey("bookings.id"), nullable=False)
+    booking_id = Column(Integer, ForeignKey("bookings.id"), nullable=False, index=True)
     passenger_profile_id = Column(Integer, ForeignKey("passenger_profiles.id"), nullable=False)
     seat_number = Column(String, nullable=False)  # e.g., "12A"
     
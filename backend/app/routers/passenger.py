@@ -1,31 +1,61 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from app.core.database import get_db
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.core.config import settings
+from app.core.database import get_async_db
 from app.core.dependencies import get_current_passenger
+from app.core.etag import conditional, time_bucket
+from app.core.pagination import PageParams, page_params, set_next_cursor
 from app.models.user import User
-from app.schemas.flight import FlightSearch, FlightResponse, FlightDetailResponse
+from app.schemas.flight import (
+    FlightCalendarResponse, FlightSearch, FlightSearchResult, FlightSearchSort, FlightDetailResponse,
+    ItineraryResponse, SeatMapFormat
+)
+from app.schemas.airport import AirportResponse
 from app.schemas.booking import BookingCreate, BookingResponse, BookingDetailResponse
 from app.schemas.payment import PaymentCreate, PaymentResponse
 from app.schemas.checkin import CheckInResponse
-from app.schemas.announcement import AnnouncementResponse
-from app.services.flight_service import search_flights, get_flight_details, get_seat_map
-from app.services.booking_service import create_booking, get_user_bookings, cancel_booking
-from app.services.payment_service import process_payment
-from app.services.checkin_service import check_in
-from app.models.announcement import Announcement
-from app.models.ticket import Ticket
-from app.models.payment import Payment
+from app.schemas.announcement import InboxAnnouncementResponse
+from app.services.flight_service import (
+    search_flights_async, get_flight_details_async, get_seat_map_async, negotiate_seat_map_format
+)
+from app.services.flight_calendar import get_flight_calendar_async
+from app.services.connection_search import search_connections
+from app.services.airport_index import search_airports
+from app.services.announcement_feed import list_announcements_async
+from app.services.announcement_inbox import mark_read_async
+from app.services.announcement_hub import (
+    announcement_hub, announcement_stream, announcements_after, upcoming_flight_ids
+)
+from app.services.resource_versions import resource_versions
+from app.services.booking_service import create_booking_async, booking_to_dict, list_user_bookings_async
+from app.services.payment_service import process_payment_async
+from app.services.checkin_service import check_in_async
 
 router = APIRouter(prefix="/passenger", tags=["Passenger"])
 
 
-@router.get("/flights/search", response_model=List[FlightResponse])
-def search_flights_endpoint(
+@router.get("/airports", response_model=List[AirportResponse])
+async def search_airports_endpoint(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=settings.MAX_PAGE_SIZE),
+    current_user: User = Depends(get_current_passenger)
+):
+    """Autocomplete airports by code, name, city or country"""
+    return search_airports(q, limit)
+
+
+@router.get("/flights/search", response_model=List[FlightSearchResult])
+async def search_flights_endpoint(
+    response: Response,
     origin: str = None,
     destination: str = None,
     date: str = None,
-    db: Session = Depends(get_db),
+    sort: FlightSearchSort = FlightSearchSort.DEPARTURE,
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_passenger)
 ):
     """Search flights by origin, destination, and date"""
@@ -49,220 +79,174 @@ def search_flights_endpoint(
     search_params = FlightSearch(
         origin=origin,
         destination=destination,
-        date=parsed_date
+        date=parsed_date,
+        sort=sort
     )
-    flights = search_flights(db, search_params)
-    return flights
+    flights = await search_flights_async(db, search_params, page)
+    return set_next_cursor(response, flights)
+
+
+@router.get("/flights/connections", response_model=List[ItineraryResponse])
+async def search_connections_endpoint(
+    origin: str,
+    destination: str,
+    date: str,
+    max_legs: int = Query(settings.CONNECTION_MAX_LEGS, ge=1, le=settings.CONNECTION_MAX_LEGS),
+    min_connection_minutes: int = Query(settings.CONNECTION_MIN_MINUTES, ge=0),
+    max_connection_minutes: int = Query(settings.CONNECTION_MAX_MINUTES, ge=0),
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    current_user: User = Depends(get_current_passenger)
+):
+    """Direct and connecting itineraries departing on a date, best first"""
+    from datetime import datetime
+    
+    try:
+        day = datetime.strptime(date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid date format. Use YYYY-MM-DD"
+        )
+    # CPU-bound on a dense network; keep it off the event loop
+    return await run_in_threadpool(search_connections, origin, destination, day, max_legs,
+                                   min_connection_minutes, max_connection_minutes, limit)
+
+
+@router.get("/flights/calendar", response_model=FlightCalendarResponse)
+async def flight_calendar_endpoint(
+    origin: str,
+    destination: str,
+    date: Optional[str] = Query(None, description="Centre of the window (YYYY-MM-DD), defaults to today"),
+    days: int = Query(15, ge=0, le=settings.CALENDAR_MAX_DAYS, description="Days before and after the centre"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_passenger)
+):
+    """Per-day flight counts and seats left on a route around a date"""
+    from datetime import datetime
+    
+    center = datetime.utcnow().date()
+    if date:
+        try:
+            center = datetime.strptime(date, "%Y-%m-%d").date()
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid date format. Use YYYY-MM-DD"
+            )
+    return await get_flight_calendar_async(db, origin, destination, center, days)
 
 
 @router.get("/flights/{flight_id}", response_model=FlightDetailResponse)
-def get_flight_details_endpoint(
+async def get_flight_details_endpoint(
     flight_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_passenger)
 ):
     """Get flight details with available seats"""
-    result = get_flight_details(db, flight_id)
-    flight = result["flight"]
-    
-    return {
-        "id": flight.id,
-        "flight_number": flight.flight_number,
-        "origin_id": flight.origin_id,
-        "destination_id": flight.destination_id,
-        "airplane_id": flight.airplane_id,
-        "scheduled_departure": flight.scheduled_departure,
-        "scheduled_arrival": flight.scheduled_arrival,
-        "gate": flight.gate,
-        "terminal": flight.terminal,
-        "status": flight.status,
-        "created_at": flight.created_at,
-        "origin_airport": {
-            "id": flight.origin_airport.id,
-            "code": flight.origin_airport.code,
-            "name": flight.origin_airport.name,
-            "city": flight.origin_airport.city,
-            "country": flight.origin_airport.country
-        },
-        "destination_airport": {
-            "id": flight.destination_airport.id,
-            "code": flight.destination_airport.code,
-            "name": flight.destination_airport.name,
-            "city": flight.destination_airport.city,
-            "country": flight.destination_airport.country
-        },
-        "airplane": {
-            "id": flight.airplane.id,
-            "model": flight.airplane.model,
-            "registration_number": flight.airplane.registration_number,
-            "total_seats": flight.airplane.total_seats
-        },
-        "available_seats": result["available_seats"],
-        "total_seats": result["total_seats"]
-    }
+    not_modified = conditional(request, response, resource_versions.current(("flight", flight_id)))
+    if not_modified:
+        return not_modified
+    return await get_flight_details_async(db, flight_id)
 
 
 @router.get("/flights/{flight_id}/seat-map")
-def get_seat_map_endpoint(
+async def get_seat_map_endpoint(
     flight_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    format: Optional[SeatMapFormat] = Query(None, description="full (default), bitmap or rle"),
+    accept: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_passenger)
 ):
     """Get seat map for a flight"""
-    return get_seat_map(db, flight_id)
+    response.headers["Vary"] = "Accept"
+    seat_map_format = negotiate_seat_map_format(format, accept)
+    not_modified = conditional(request, response, resource_versions.current(("flight", flight_id)), seat_map_format)
+    if not_modified:
+        return not_modified
+    return await get_seat_map_async(db, flight_id, seat_map_format)
 
 
 @router.post("/bookings", response_model=BookingResponse, status_code=status.HTTP_201_CREATED)
-def create_booking_endpoint(
+async def create_booking_endpoint(
     booking_data: BookingCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_passenger)
 ):
     """Create a new booking"""
-    booking = create_booking(
+    booking = await create_booking_async(
         db,
         current_user.id,
         booking_data.flight_id,
         booking_data.passenger_profiles
     )
+    announcement_hub.follow(current_user.id, booking.flight_id)
     
-    # Format response
-    tickets = db.query(Ticket).filter(Ticket.booking_id == booking.id).all()
-    return {
-        "id": booking.id,
-        "pnr": booking.pnr,
-        "user_id": booking.user_id,
-        "flight_id": booking.flight_id,
-        "status": booking.status,
-        "seat_hold_expires_at": booking.seat_hold_expires_at,
-        "created_at": booking.created_at,
-        "flight": {
-            "id": booking.flight.id,
-            "flight_number": booking.flight.flight_number,
-            "scheduled_departure": booking.flight.scheduled_departure,
-            "scheduled_arrival": booking.flight.scheduled_arrival
-        },
-        "tickets": [
-            {
-                "id": t.id,
-                "ticket_number": t.ticket_number,
-                "seat_number": t.seat_number
-            }
-            for t in tickets
-        ]
-    }
+    return booking_to_dict(booking)
 
 
 @router.get("/bookings/upcoming", response_model=List[BookingDetailResponse])
-def get_upcoming_bookings(
-    db: Session = Depends(get_db),
+async def get_upcoming_bookings(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_passenger)
 ):
     """Get upcoming trips"""
-    bookings = get_user_bookings(db, current_user.id, upcoming_only=True)
-    result = []
-    for booking in bookings:
-        payment = db.query(Payment).filter(Payment.booking_id == booking.id).first()
-        tickets = db.query(Ticket).filter(Ticket.booking_id == booking.id).all()
-        result.append({
-            "id": booking.id,
-            "pnr": booking.pnr,
-            "user_id": booking.user_id,
-            "flight_id": booking.flight_id,
-            "status": booking.status,
-            "seat_hold_expires_at": booking.seat_hold_expires_at,
-            "created_at": booking.created_at,
-            "flight": {
-                "id": booking.flight.id,
-                "flight_number": booking.flight.flight_number,
-                "scheduled_departure": booking.flight.scheduled_departure,
-                "scheduled_arrival": booking.flight.scheduled_arrival
-            },
-            "tickets": [
-                {
-                    "id": t.id,
-                    "ticket_number": t.ticket_number,
-                    "seat_number": t.seat_number
-                }
-                for t in tickets
-            ],
-            "payment": {
-                "id": payment.id,
-                "amount": payment.amount,
-                "status": payment.status
-            } if payment else None
-        })
-    return result
+    not_modified = conditional(request, response, current_user.id, time_bucket(),
+                               resource_versions.current(("trips", current_user.id), "flights"))
+    if not_modified:
+        return not_modified
+    return set_next_cursor(response, await list_user_bookings_async(db, current_user.id, True, page))
 
 
 @router.get("/bookings/past", response_model=List[BookingDetailResponse])
-def get_past_bookings(
-    db: Session = Depends(get_db),
+async def get_past_bookings(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_passenger)
 ):
     """Get past trips"""
-    bookings = get_user_bookings(db, current_user.id, upcoming_only=False)
-    result = []
-    for booking in bookings:
-        payment = db.query(Payment).filter(Payment.booking_id == booking.id).first()
-        tickets = db.query(Ticket).filter(Ticket.booking_id == booking.id).all()
-        result.append({
-            "id": booking.id,
-            "pnr": booking.pnr,
-            "user_id": booking.user_id,
-            "flight_id": booking.flight_id,
-            "status": booking.status,
-            "seat_hold_expires_at": booking.seat_hold_expires_at,
-            "created_at": booking.created_at,
-            "flight": {
-                "id": booking.flight.id,
-                "flight_number": booking.flight.flight_number,
-                "scheduled_departure": booking.flight.scheduled_departure,
-                "scheduled_arrival": booking.flight.scheduled_arrival
-            },
-            "tickets": [
-                {
-                    "id": t.id,
-                    "ticket_number": t.ticket_number,
-                    "seat_number": t.seat_number
-                }
-                for t in tickets
-            ],
-            "payment": {
-                "id": payment.id,
-                "amount": payment.amount,
-                "status": payment.status
-            } if payment else None
-        })
-    return result
+    not_modified = conditional(request, response, current_user.id, time_bucket(),
+                               resource_versions.current(("trips", current_user.id), "flights"))
+    if not_modified:
+        return not_modified
+    return set_next_cursor(response, await list_user_bookings_async(db, current_user.id, False, page))
 
 
 @router.post("/payments", response_model=PaymentResponse, status_code=status.HTTP_201_CREATED)
-def process_payment_endpoint(
+async def process_payment_endpoint(
     payment_data: PaymentCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_passenger)
 ):
     """Process payment for a booking (mock payment)"""
-    return process_payment(db, payment_data.booking_id, payment_data.transaction_id)
+    return await process_payment_async(db, payment_data.booking_id, payment_data.transaction_id)
 
 
 @router.post("/check-in/{ticket_id}", response_model=CheckInResponse)
-def check_in_endpoint(
+async def check_in_endpoint(
     ticket_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_passenger)
 ):
     """Check in for a flight (24h-1h before departure)"""
-    checkin = check_in(db, ticket_id, current_user.id)
+    checkin = await check_in_async(db, ticket_id, current_user.id)
     
-    # Get ticket and flight info
+    # Get ticket and flight info (already in the session's identity map)
     from app.models.ticket import Ticket
     from app.models.booking import Booking
+    from app.models.flight import Flight
     
-    ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
-    booking = db.query(Booking).filter(Booking.id == ticket.booking_id).first()
-    flight = booking.flight
+    ticket = await db.get(Ticket, ticket_id)
+    booking = await db.get(Booking, ticket.booking_id)
+    flight = await db.get(Flight, booking.flight_id)
     
     return {
         "id": checkin.id,
@@ -282,38 +266,75 @@ def check_in_endpoint(
     }
 
 
-@router.get("/announcements", response_model=List[AnnouncementResponse])
-def get_announcements(
-    db: Session = Depends(get_db),
+@router.get("/announcements", response_model=List[InboxAnnouncementResponse])
+async def get_announcements(
+    request: Request,
+    response: Response,
+    since: Optional[str] = Query(None, description="Only newer deliveries: the last inbox_id seen, or an ISO timestamp"),
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_passenger)
 ):
     """Get announcements for user's upcoming flights"""
-    from app.models.booking import Booking
-    from app.models.ticket import Ticket
-    
-    # Get user's upcoming bookings
-    bookings = get_user_bookings(db, current_user.id, upcoming_only=True)
-    flight_ids = [b.flight_id for b in bookings]
+    from datetime import datetime
     
-    if not flight_ids:
-        return []
+    not_modified = conditional(request, response, current_user.id, time_bucket(),
+                               resource_versions.current(("inbox", current_user.id), "flights", "announcements"))
+    if not_modified:
+        return not_modified
     
-    announcements = db.query(Announcement).filter(
-        Announcement.flight_id.in_(flight_ids)
-    ).order_by(Announcement.created_at.desc()).all()
+    since_id = since_time = None
+    if since is not None:
+        try:
+            if since.isdigit():
+                since_id = int(since)
+            else:
+                since_time = datetime.fromisoformat(since)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid since. Use an inbox id or an ISO timestamp"
+            )
+    return set_next_cursor(response, await list_announcements_async(db, current_user.id, page, since_id, since_time))
+
+
+@router.post("/announcements/{announcement_id}/read")
+async def mark_announcement_read(
+    announcement_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_passenger)
+):
+    """Mark an announcement in the user's inbox as read"""
+    entry = await mark_read_async(db, current_user.id, announcement_id)
     
-    result = []
-    for ann in announcements:
-        result.append({
-            "id": ann.id,
-            "flight_id": ann.flight_id,
-            "announcement_type": ann.announcement_type,
-            "message": ann.message,
-            "created_at": ann.created_at,
-            "flight": {
-                "id": ann.flight.id,
-                "flight_number": ann.flight.flight_number
-            }
-        })
-    return result
+    return {
+        "message": "Announcement marked as read",
+        "announcement_id": entry.announcement_id,
+        "read_at": entry.read_at
+    }
+
 
+@router.get("/announcements/stream")
+async def stream_announcements(
+    last_event_id: Optional[int] = Header(None, description="Id of the last announcement received"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_passenger)
+):
+    """Live announcements for user's upcoming flights (Server-Sent Events)"""
+    flight_ids = await db.run_sync(upcoming_flight_ids, current_user.id)
+    # Subscribe before reading the backlog, so nothing published in between is lost
+    subscriber = announcement_hub.subscribe(current_user.id, flight_ids)
+    try:
+        backlog = []
+        if last_event_id is not None:
+            backlog = await db.run_sync(announcements_after, flight_ids, last_event_id)
+        # The stream stays open for long; give the connection back now
+        await db.close()
+    except BaseException:
+        announcement_hub.unsubscribe(subscriber)
+        raise
+    return StreamingResponse(
+        announcement_stream(subscriber, backlog, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
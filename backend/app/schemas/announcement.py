@@ -22,3 +22,8 @@ class AnnouncementResponse(AnnouncementBase):
     class Config:
         from_attributes = True
 
+
+class InboxAnnouncementResponse(AnnouncementResponse):
+    inbox_id: int
+    read: bool
+
@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from datetime import datetime
+
+
+class ChangeEventResponse(BaseModel):
+    id: int
+    entity: str
+    entity_id: int
+    action: str
+    changes: dict
+    row: dict
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
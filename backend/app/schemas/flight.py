@@ -1,7 +1,8 @@
 from pydantic import BaseModel
-from typing import Optional
-from datetime import datetime
+from typing import List, Optional
+from datetime import date, datetime
 from app.models.flight import FlightStatus
+import enum
 
 
 class FlightBase(BaseModel):
@@ -31,10 +32,23 @@ class FlightUpdate(BaseModel):
     status: Optional[FlightStatus] = None
 
 
+class FlightSearchSort(str, enum.Enum):
+    DEPARTURE = "departure"  # Earliest first
+    DURATION = "duration"  # Shortest first
+    SEATS_LEFT = "seats_left"  # Most seats left first
+
+
 class FlightSearch(BaseModel):
     origin: Optional[str] = None  # Airport code
     destination: Optional[str] = None  # Airport code
     date: Optional[datetime] = None
+    sort: FlightSearchSort = FlightSearchSort.DEPARTURE
+
+
+class SeatMapFormat(str, enum.Enum):
+    FULL = "full"  # One {"seat", "available"} object per seat
+    BITMAP = "bitmap"  # Base64 bitmap of free seat positions
+    RLE = "rle"  # Run lengths of free/taken seat positions
 
 
 class FlightResponse(FlightBase):
@@ -45,10 +59,47 @@ class FlightResponse(FlightBase):
         from_attributes = True
 
 
+class FlightSearchResult(FlightResponse):
+    origin_code: str
+    destination_code: str
+    duration_minutes: int
+    seats_available: int
+
+
+class ItineraryLeg(FlightResponse):
+    origin_code: str
+    destination_code: str
+
+
+class ItineraryResponse(BaseModel):
+    legs: List[ItineraryLeg]
+    departure: datetime
+    arrival: datetime
+    duration_minutes: int
+    stops: int
+    layover_minutes: List[int]
+
+
+class FlightCalendarDay(BaseModel):
+    date: date
+    flights: int
+    earliest_departure: Optional[datetime] = None
+    min_seats_available: Optional[int] = None
+    max_seats_available: Optional[int] = None
+
+
+class FlightCalendarResponse(BaseModel):
+    origin: str
+    destination: str
+    days: List[FlightCalendarDay]
+
+
 class FlightDetailResponse(FlightResponse):
     origin_airport: dict
     destination_airport: dict
     airplane: dict
     available_seats: int
     total_seats: int
+    held_seats: int
+    booked_seats: int
 
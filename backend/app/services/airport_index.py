@@ -0,0 +1,168 @@
+"""
+In-memory airport autocomplete.
+
+Every airport is indexed under its code and under each word of its name, city
+and country. Words are case- and accent-folded ("São Paulo" matches "sao
+pau"), and every prefix of every word maps to the airports it matches,
+already ranked: airports whose code starts with the prefix first, then the
+rest, each in code order. A one-word query is one dictionary lookup; with
+several words, an airport must match every one of them.
+
+The index is loaded at startup. Airports created, changed or deleted through
+the ORM are applied once their transaction commits; the index is small, so
+each change rebuilds it from the current entries.
+"""
+import re
+import threading
+import unicodedata
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from app.core import metrics
+from app.core.commit_hooks import on_commit, pending
+from app.models.airport import Airport
+
+_WORD = re.compile(r"\w+")
+
+
+class AirportEntry(NamedTuple):
+    id: int
+    code: str
+    name: str
+    city: str
+    country: str
+
+
+def fold(text: str) -> str:
+    """Lower-case `text` and strip accents"""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def words(text: str) -> List[str]:
+    return _WORD.findall(fold(text))
+
+
+def entry_words(entry: AirportEntry) -> Tuple[str, ...]:
+    return tuple({*words(entry.code), *words(entry.name), *words(entry.city), *words(entry.country)})
+
+
+def _build_prefixes(entries: Dict[int, AirportEntry]) -> Dict[str, Tuple[AirportEntry, ...]]:
+    matches: Dict[str, set] = {}
+    for entry in entries.values():
+        for word in entry_words(entry):
+            for end in range(1, len(word) + 1):
+                matches.setdefault(word[:end], set()).add(entry)
+    return {
+        prefix: tuple(sorted(found, key=lambda entry: (not fold(entry.code).startswith(prefix), entry.code)))
+        for prefix, found in matches.items()
+    }
+
+
+class AirportIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[int, AirportEntry] = {}
+        # Replaced as a whole on every change, so lookups need no lock
+        self._prefixes: Dict[str, Tuple[AirportEntry, ...]] = {}
+        self._words: Dict[int, Tuple[str, ...]] = {}
+        self._ids: Dict[str, int] = {}
+        self.ready = False
+        self.lookups = 0
+
+    def load(self, db: Session) -> None:
+        """(Re)build the whole index from the database"""
+        columns = [getattr(Airport, field) for field in AirportEntry._fields]
+        entries = {row[0]: AirportEntry(*row) for row in db.query(*columns)}
+        with self._lock:
+            self._replace(entries)
+            self.ready = True
+
+    def _replace(self, entries: Dict[int, AirportEntry]) -> None:
+        self._words = {airport_id: entry_words(entry) for airport_id, entry in entries.items()}
+        self._ids = {entry.code: airport_id for airport_id, entry in entries.items()}
+        self._entries, self._prefixes = entries, _build_prefixes(entries)
+
+    def apply(self, upserted: Dict[int, AirportEntry], deleted: set) -> None:
+        """Apply committed airport changes"""
+        if not self.ready:
+            return
+        with self._lock:
+            entries = {
+                airport_id: entry for airport_id, entry in self._entries.items() if airport_id not in deleted
+            }
+            entries.update(upserted)
+            self._replace(entries)
+
+    def airport_id(self, code: str) -> Optional[int]:
+        return self._ids.get(code.upper())
+
+    def search(self, query: str, limit: int) -> List[AirportEntry]:
+        """Up to `limit` airports matching every word of `query`, best first"""
+        self.lookups += 1
+        prefixes, airport_words = self._prefixes, self._words
+        terms = words(query)
+        if not terms:
+            return []
+        if len(terms) == 1:
+            return list(prefixes.get(terms[0], ())[:limit])
+
+        # Check the rarest word's matches against the other words, then rank by the first word
+        rarest = min(terms, key=lambda term: len(prefixes.get(term, ())))
+        found = [
+            entry for entry in prefixes.get(rarest, ())
+            if all(any(word.startswith(term) for word in airport_words[entry.id]) for term in terms)
+        ]
+        found.sort(key=lambda entry: (not fold(entry.code).startswith(terms[0]), entry.code))
+        return found[:limit]
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "airports": len(self._entries),
+            "prefixes": len(self._prefixes),
+            "lookups": self.lookups,
+        }
+
+
+airport_index = AirportIndex()
+metrics.register("airport_index", airport_index.stats)
+
+
+def _session_changes(session: Session) -> Tuple[Dict[int, AirportEntry], set]:
+    return pending(session, "changed_airports", lambda: ({}, set()))
+
+
+@event.listens_for(Airport, "after_insert")
+@event.listens_for(Airport, "after_update")
+def _record_changed_airport(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        upserted, deleted = _session_changes(session)
+        upserted[target.id] = AirportEntry(*(getattr(target, field) for field in AirportEntry._fields))
+        deleted.discard(target.id)
+
+
+@event.listens_for(Airport, "after_delete")
+def _record_deleted_airport(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        upserted, deleted = _session_changes(session)
+        upserted.pop(target.id, None)
+        deleted.add(target.id)
+
+
+@on_commit("changed_airports")
+def _apply_committed_airports(changes):
+    airport_index.apply(*changes)
+
+
+def search_airports(query: str, limit: int) -> List[dict]:
+    if not airport_index.ready:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Airport search is not available"
+        )
+    return [entry._asdict() for entry in airport_index.search(query, limit)]
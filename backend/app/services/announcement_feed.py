@@ -0,0 +1,69 @@
+"""
+Announcement feed for polling clients.
+
+A feed is read from the passenger's inbox (see `announcement_inbox`), newest
+delivery first, keeping announcements of flights that have not departed yet.
+Each item carries its `inbox_id`, the position of the entry in the inbox.
+
+`since` limits a poll to entries delivered after the client's last one, by
+inbox id (a narrower range of the inbox index) or by delivery time (UTC; a
+timestamp with an offset is converted). Inbox ids follow delivery, not
+announcement creation, so an older announcement copied in by a later booking
+is still newer than the client's `since`. For an id, a poll with nothing new
+never touches the database: it is answered from the passenger's in-memory
+inbox mark, which is only raised once the delivery has committed.
+"""
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, contains_eager
+from app.core.database import naive_utc
+from app.core.pagination import Page, PageParams, paginate
+from app.models.announcement import Announcement
+from app.models.announcement_inbox import InboxEntry
+from app.models.flight import Flight
+from app.services.announcement_hub import announcement_to_dict
+from app.services.announcement_inbox import inbox_marks
+
+
+def nothing_new_since(user_id: int, since_id: int) -> bool:
+    """Whether nothing was delivered to the user's inbox after entry `since_id`"""
+    if not inbox_marks.ready or inbox_marks.latest(user_id) > since_id:
+        return False
+    inbox_marks.nothing_new += 1
+    return True
+
+
+def list_announcements(db: Session, user_id: int, page: PageParams, since_id: Optional[int] = None,
+                       since_time: Optional[datetime] = None) -> Page:
+    """Inbox announcements on the user's upcoming flights, newest delivery first, optionally only newer ones"""
+    if since_id is not None and nothing_new_since(user_id, since_id):
+        return Page([], None)
+
+    query = db.query(InboxEntry).join(InboxEntry.announcement).join(Announcement.flight).options(
+        contains_eager(InboxEntry.announcement).contains_eager(Announcement.flight)
+    ).filter(
+        InboxEntry.user_id == user_id,
+        Flight.scheduled_departure > datetime.utcnow()
+    )
+    if since_id is not None:
+        query = query.filter(InboxEntry.id > since_id)
+    if since_time is not None:
+        query = query.filter(InboxEntry.delivered_at > naive_utc(since_time))
+
+    # Newest first; ids follow delivery order
+    entries = paginate(query, (InboxEntry.id,), page, descending=True)
+    return Page([
+        {
+            **announcement_to_dict(entry.announcement, entry.announcement.flight.flight_number),
+            "inbox_id": entry.id,
+            "read": entry.read_at is not None
+        }
+        for entry in entries.items
+    ], entries.next_cursor)
+
+
+async def list_announcements_async(db: AsyncSession, user_id: int, page: PageParams,
+                                   since_id: Optional[int] = None, since_time: Optional[datetime] = None) -> Page:
+    return await db.run_sync(list_announcements, user_id, page, since_id, since_time)
@@ -0,0 +1,178 @@
+"""
+Push delivery of announcements over Server-Sent Events.
+
+A passenger opens one long-lived stream. When it connects, the flights of the
+passenger's upcoming bookings that are not cancelled (the passengers the inbox
+fan-out delivers to) are looked up once and the stream subscribes to them in
+an in-memory registry (flight id -> open streams). A new announcement is
+handed to every stream subscribed to its flight; idle streams only send a
+heartbeat comment every ANNOUNCEMENT_HEARTBEAT_SECONDS and cost no database
+work.
+
+Every event carries the announcement id as its SSE id. A client that
+reconnects with `Last-Event-ID` first gets the announcements it missed, in one
+query, then live ones. The backlog is capped at
+ANNOUNCEMENT_STREAM_QUEUE_SIZE announcements; a stream that sends a full
+backlog, or falls that many events behind, is closed and the client resumes
+the same way.
+
+The registry lives in the event loop of one process: announcements created by
+another process are not pushed until the client reconnects.
+"""
+import asyncio
+import json
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
+from app.core import metrics
+from app.core.config import settings
+from app.models.announcement import Announcement
+from app.models.booking import Booking, BookingStatus
+from app.models.flight import Flight
+
+
+def announcement_to_dict(announcement: Announcement, flight_number: str) -> dict:
+    return {
+        "id": announcement.id,
+        "flight_id": announcement.flight_id,
+        "announcement_type": announcement.announcement_type,
+        "message": announcement.message,
+        "created_at": announcement.created_at,
+        "flight": {
+            "id": announcement.flight_id,
+            "flight_number": flight_number
+        }
+    }
+
+
+class Subscriber:
+    __slots__ = ("user_id", "flight_ids", "queue", "closed")
+
+    def __init__(self, user_id: int, flight_ids: Iterable[int]):
+        self.user_id = user_id
+        self.flight_ids = set(flight_ids)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.ANNOUNCEMENT_STREAM_QUEUE_SIZE)
+        self.closed = False
+
+
+class AnnouncementHub:
+    """Open streams by flight and by user; only used from the event loop"""
+
+    def __init__(self):
+        self._by_flight: Dict[int, Set[Subscriber]] = {}
+        self._by_user: Dict[int, Set[Subscriber]] = {}
+        self.published = 0
+        self.delivered = 0
+        self.dropped_streams = 0
+
+    def subscribe(self, user_id: int, flight_ids: Iterable[int]) -> Subscriber:
+        subscriber = Subscriber(user_id, flight_ids)
+        self._by_user.setdefault(user_id, set()).add(subscriber)
+        for flight_id in subscriber.flight_ids:
+            self._by_flight.setdefault(flight_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        subscriber.closed = True
+        for registry, key in ((self._by_user, subscriber.user_id),
+                              *((self._by_flight, flight_id) for flight_id in subscriber.flight_ids)):
+            subscribers = registry.get(key)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del registry[key]
+
+    def follow(self, user_id: int, flight_id: int) -> None:
+        """Add a flight to the user's open streams, e.g. after a new booking"""
+        for subscriber in self._by_user.get(user_id, ()):
+            if flight_id not in subscriber.flight_ids:
+                subscriber.flight_ids.add(flight_id)
+                self._by_flight.setdefault(flight_id, set()).add(subscriber)
+
+    def publish(self, announcement: dict) -> int:
+        """Hand an announcement to every stream following its flight; returns how many"""
+        self.published += 1
+        delivered = 0
+        for subscriber in list(self._by_flight.get(announcement["flight_id"], ())):
+            try:
+                subscriber.queue.put_nowait(announcement)
+                delivered += 1
+            except asyncio.QueueFull:
+                # Too far behind; the client resumes from its last event id
+                self.dropped_streams += 1
+                self.unsubscribe(subscriber)
+        self.delivered += delivered
+        return delivered
+
+    def stats(self) -> dict:
+        return {
+            "streams": sum(len(subscribers) for subscribers in self._by_user.values()),
+            "flights": len(self._by_flight),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped_streams": self.dropped_streams,
+        }
+
+
+announcement_hub = AnnouncementHub()
+metrics.register("announcement_hub", announcement_hub.stats)
+
+
+def upcoming_flight_ids(db: Session, user_id: int) -> List[int]:
+    return [
+        flight_id for (flight_id,) in db.query(Booking.flight_id).join(Flight).filter(
+            Booking.user_id == user_id,
+            Booking.status != BookingStatus.CANCELLED,
+            Flight.scheduled_departure > datetime.utcnow()
+        ).distinct()
+    ]
+
+
+def announcements_after(db: Session, flight_ids: Iterable[int], last_id: int) -> List[dict]:
+    """Announcements on the flights newer than `last_id`, oldest first"""
+    flight_ids = list(flight_ids)
+    if not flight_ids:
+        return []
+    rows = db.query(Announcement, Flight.flight_number).join(Flight).filter(
+        Announcement.flight_id.in_(flight_ids),
+        Announcement.id > last_id
+    ).order_by(Announcement.id).limit(settings.ANNOUNCEMENT_STREAM_QUEUE_SIZE)
+    return [announcement_to_dict(announcement, flight_number) for announcement, flight_number in rows]
+
+
+def _event(announcement: dict) -> str:
+    data = json.dumps(jsonable_encoder(announcement))
+    return f"id: {announcement['id']}\nevent: announcement\ndata: {data}\n\n"
+
+
+async def announcement_stream(subscriber: Subscriber, backlog: List[dict],
+                              last_id: Optional[int]) -> AsyncIterator[str]:
+    """SSE body: the backlog, then live announcements and heartbeats until the client leaves"""
+    try:
+        yield f"retry: {settings.ANNOUNCEMENT_RETRY_MILLISECONDS}\n\n"
+        for announcement in backlog:
+            last_id = announcement["id"]
+            yield _event(announcement)
+        if len(backlog) == settings.ANNOUNCEMENT_STREAM_QUEUE_SIZE:
+            # More may be missing; the client reconnects from the last one sent
+            return
+        while True:
+            try:
+                announcement = await asyncio.wait_for(
+                    subscriber.queue.get(), settings.ANNOUNCEMENT_HEARTBEAT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                if subscriber.closed:
+                    return
+                yield ": heartbeat\n\n"
+                continue
+            # Announcements published while the backlog was read arrive twice
+            if last_id is None or announcement["id"] > last_id:
+                last_id = announcement["id"]
+                yield _event(announcement)
+            if subscriber.closed and subscriber.queue.empty():
+                return
+    finally:
+        announcement_hub.unsubscribe(subscriber)
@@ -0,0 +1,270 @@
+"""
+Per-passenger announcement inbox.
+
+Announcements are delivered when they are written: each one is copied into
+the inbox of every passenger with a non-cancelled booking on its flight, so
+reading a feed is one range scan of the (user id, entry id) index and every
+entry keeps its own read state. Entry ids follow delivery order, so an
+announcement copied in late (by a booking, or a fan-out that was retried)
+still comes after whatever the passenger has already seen.
+
+The copy (fan-out) runs in a background worker started in the app lifespan,
+so creating an announcement only commits the announcement. Passengers are
+covered in user id order, INBOX_FANOUT_BATCH_SIZE per transaction, so a
+flight with thousands of bookings never holds the write lock for long. The
+announcement is stamped `fanned_out_at` with its last batch; announcements
+left unstamped by a failure or a restart are fanned out again at startup, and
+entries that already exist are skipped. A booking copies its flight's
+announcements into the passenger's inbox itself, in the booking transaction,
+so one made while a fan-out is queued or running misses nothing.
+
+Each passenger's newest entry id (their high-water mark) is kept in memory
+and raised once the transaction that delivered it commits, so a poll can tell
+there is nothing new without a query and never skips an entry that is not
+visible yet. Marks are per process, like the other in-memory indexes: entries
+written by another process show up once this one reloads them at startup.
+"""
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, insert, literal, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core import metrics
+from app.core.commit_hooks import on_commit, pending
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.announcement import Announcement
+from app.models.announcement_inbox import InboxEntry
+from app.models.booking import Booking, BookingStatus
+from app.services.resource_versions import touch
+
+logger = logging.getLogger(__name__)
+
+
+class InboxMarks:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._marks: Dict[int, int] = {}
+        self.ready = False
+        self.nothing_new = 0
+
+    def load(self, db: Session) -> None:
+        """(Re)read every passenger's newest inbox entry id"""
+        marks = dict(db.query(InboxEntry.user_id, func.max(InboxEntry.id)).group_by(InboxEntry.user_id))
+        with self._lock:
+            for user_id, entry_id in self._marks.items():
+                # Keep marks raised while loading
+                marks[user_id] = max(marks.get(user_id, 0), entry_id)
+            self._marks = marks
+        self.ready = True
+
+    def raise_marks(self, marks: Dict[int, int]) -> None:
+        # Commits from the event loop and from threadpool requests race here
+        with self._lock:
+            for user_id, entry_id in marks.items():
+                if entry_id > self._marks.get(user_id, 0):
+                    self._marks[user_id] = entry_id
+
+    def latest(self, user_id: int) -> int:
+        return self._marks.get(user_id, 0)
+
+    def stats(self) -> dict:
+        return {"ready": self.ready, "users": len(self._marks), "nothing_new": self.nothing_new}
+
+
+inbox_marks = InboxMarks()
+metrics.register("inbox_marks", inbox_marks.stats)
+
+
+def _add_to_inbox():
+    # Entries are never written twice; re-runs and overlapping copies skip them
+    return insert(InboxEntry).prefix_with("OR IGNORE").returning(InboxEntry.id, InboxEntry.user_id)
+
+
+def _delivered(db: Session, entries: Iterable[Tuple[int, int]]) -> List[int]:
+    """Note new (entry id, user id) rows for the marks raised on commit; returns the users"""
+    marks = pending(db, "inbox_marks", dict)
+    user_ids = []
+    for entry_id, user_id in entries:
+        if entry_id > marks.get(user_id, 0):
+            marks[user_id] = entry_id
+        user_ids.append(user_id)
+    if user_ids:
+        touch(db, *(("inbox", user_id) for user_id in set(user_ids)))
+    return user_ids
+
+
+@on_commit("inbox_marks")
+def _raise_committed_marks(marks):
+    inbox_marks.raise_marks(marks)
+
+
+def fan_out_announcement(db: Session, announcement_id: int, batch_size: int) -> int:
+    """Deliver an announcement to every passenger booked on its flight, committing after each batch"""
+    announcement = db.get(Announcement, announcement_id)
+    if announcement is None or announcement.fanned_out_at is not None:
+        return 0
+
+    flight_id = announcement.flight_id
+    delivered = 0
+    last_user_id = 0
+    while True:
+        user_ids = db.execute(
+            select(Booking.user_id).where(
+                Booking.flight_id == flight_id,
+                Booking.status != BookingStatus.CANCELLED,
+                Booking.user_id > last_user_id
+            ).distinct().order_by(Booking.user_id).limit(batch_size)
+        ).scalars().all()
+        if user_ids:
+            delivered_at = datetime.utcnow()
+            _delivered(db, db.execute(_add_to_inbox(), [
+                {"user_id": user_id, "announcement_id": announcement_id, "delivered_at": delivered_at}
+                for user_id in user_ids
+            ]))
+            delivered += len(user_ids)
+            last_user_id = user_ids[-1]
+        if len(user_ids) < batch_size:
+            announcement.fanned_out_at = datetime.utcnow()
+            db.commit()
+            return delivered
+        db.commit()
+
+
+def deliver_flight_announcements(db: Session, user_id: int, flight_id: int) -> None:
+    """Copy a flight's announcements into a passenger's inbox, e.g. on booking; does not commit"""
+    _delivered(db, db.execute(_add_to_inbox().from_select(
+        ["user_id", "announcement_id", "delivered_at"],
+        select(literal(user_id), Announcement.id, literal(datetime.utcnow()))
+        .where(Announcement.flight_id == flight_id).order_by(Announcement.id)
+    )))
+
+
+def fill_inbox(conn: Connection) -> None:
+    """Deliver every announcement not fanned out yet in one statement (schema upgrades)"""
+    now = datetime.utcnow().isoformat(" ")
+    conn.exec_driver_sql(
+        "INSERT OR IGNORE INTO announcement_inbox (user_id, announcement_id, delivered_at) "
+        "SELECT DISTINCT bookings.user_id, announcements.id, ? FROM announcements "
+        "JOIN bookings ON bookings.flight_id = announcements.flight_id "
+        "WHERE announcements.fanned_out_at IS NULL AND bookings.status != ? "
+        "ORDER BY announcements.id, bookings.user_id",
+        (now, BookingStatus.CANCELLED.value)
+    )
+    conn.exec_driver_sql(
+        "UPDATE announcements SET fanned_out_at = ? WHERE fanned_out_at IS NULL",
+        (now,)
+    )
+
+
+def pending_fan_outs(db: Session) -> List[int]:
+    return list(db.execute(
+        select(Announcement.id).where(Announcement.fanned_out_at.is_(None)).order_by(Announcement.id)
+    ).scalars())
+
+
+def mark_read(db: Session, user_id: int, announcement_id: int) -> InboxEntry:
+    entry = db.query(InboxEntry).filter(
+        InboxEntry.user_id == user_id,
+        InboxEntry.announcement_id == announcement_id
+    ).first()
+    if not entry:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Announcement not found"
+        )
+    if entry.read_at is None:
+        entry.read_at = datetime.utcnow()
+        touch(db, ("inbox", user_id))
+        db.commit()
+    return entry
+
+
+async def mark_read_async(db: AsyncSession, user_id: int, announcement_id: int) -> InboxEntry:
+    return await db.run_sync(mark_read, user_id, announcement_id)
+
+
+class InboxFanout:
+    def __init__(self, batch_size: int, retry_delay: float):
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.fan_outs = 0
+        self.delivered_total = 0
+        self.last_delivered = 0
+        self.last_duration_ms = 0.0
+        self.errors = 0
+
+    def submit(self, announcement_id: int) -> None:
+        """Queue a committed announcement; without a running worker it waits for the next startup"""
+        if self._queue is not None:
+            self._queue.put_nowait(announcement_id)
+
+    async def fan_out(self, announcement_id: int) -> int:
+        started = time.perf_counter()
+        async with AsyncSessionLocal() as db:
+            delivered = await db.run_sync(fan_out_announcement, announcement_id, self.batch_size)
+        self.fan_outs += 1
+        self.delivered_total += delivered
+        self.last_delivered = delivered
+        self.last_duration_ms = round((time.perf_counter() - started) * 1000, 2)
+        return delivered
+
+    async def _retry_later(self, announcement_id: int) -> None:
+        await asyncio.sleep(self.retry_delay)
+        self.submit(announcement_id)
+
+    async def _run(self) -> None:
+        async with AsyncSessionLocal() as db:
+            for announcement_id in await db.run_sync(pending_fan_outs):
+                self.submit(announcement_id)
+        while True:
+            announcement_id = await self._queue.get()
+            try:
+                await self.fan_out(announcement_id)
+            except Exception:
+                # Batches already committed stay; the rest is retried, skipping existing entries
+                self.errors += 1
+                logger.exception("Announcement fan-out failed")
+                asyncio.create_task(self._retry_later(announcement_id))
+
+    def start(self) -> None:
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        # Announcements still queued are fanned out at the next startup
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._queue = None
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "fan_outs": self.fan_outs,
+            "delivered_total": self.delivered_total,
+            "last_delivered": self.last_delivered,
+            "last_duration_ms": self.last_duration_ms,
+            "errors": self.errors,
+        }
+
+
+inbox_fanout = InboxFanout(
+    batch_size=settings.INBOX_FANOUT_BATCH_SIZE,
+    retry_delay=settings.INBOX_FANOUT_RETRY_SECONDS,
+)
+metrics.register("inbox_fanout", inbox_fanout.stats)
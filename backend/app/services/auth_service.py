@@ -1,13 +1,16 @@
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
 from datetime import timedelta
+from typing import Optional
 from app.models.user import User
 from app.schemas.user import UserCreate, UserLogin
 from app.core.security import verify_password, get_password_hash, create_access_token
 from app.core.config import settings
+from app.core.password_pool import verify_password_async, get_password_hash_async
 
 
-def create_user(db: Session, user_data: UserCreate) -> User:
+def _insert_user(db: Session, user_data: UserCreate, hashed_password: str) -> User:
     # Check if username or email already exists
     existing_user = db.query(User).filter(
         (User.username == user_data.username) | (User.email == user_data.email)
@@ -17,8 +20,7 @@ def create_user(db: Session, user_data: UserCreate) -> User:
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username or email already registered"
         )
-    
-    hashed_password = get_password_hash(user_data.password)
+
     db_user = User(
         username=user_data.username,
         email=user_data.email,
@@ -31,33 +33,56 @@ def create_user(db: Session, user_data: UserCreate) -> User:
     return db_user
 
 
-def authenticate_user(db: Session, login_data: UserLogin) -> User:
-    user = db.query(User).filter(User.username == login_data.username).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect username or password"
-        )
-    
-    if not verify_password(login_data.password, user.hashed_password):
+def create_user(db: Session, user_data: UserCreate) -> User:
+    return _insert_user(db, user_data, get_password_hash(user_data.password))
+
+
+def get_user_by_username(db: Session, username: str) -> Optional[User]:
+    return db.query(User).filter(User.username == username).first()
+
+
+def _check_login(user: Optional[User], password_valid: bool) -> User:
+    if not user or not password_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password"
         )
-    
+
     if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="User account is inactive"
         )
-    
+
     return user
 
 
+def authenticate_user(db: Session, login_data: UserLogin) -> User:
+    user = get_user_by_username(db, login_data.username)
+    password_valid = user is not None and verify_password(login_data.password, user.hashed_password)
+    return _check_login(user, password_valid)
+
+
 def create_token_for_user(user: User) -> str:
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.id}, expires_delta=access_token_expires
+        data={"sub": str(user.id)}, expires_delta=access_token_expires
     )
     return access_token
 
+
+# Async versions. bcrypt runs on its own bounded pool, outside the event loop.
+
+async def create_user_async(db: AsyncSession, user_data: UserCreate) -> User:
+    hashed_password = await get_password_hash_async(user_data.password)
+    return await db.run_sync(_insert_user, user_data, hashed_password)
+
+
+async def authenticate_user_async(db: AsyncSession, login_data: UserLogin) -> User:
+    user = await db.run_sync(get_user_by_username, login_data.username)
+    # Give the connection back to the pool while waiting for bcrypt
+    await db.commit()
+    password_valid = user is not None and await verify_password_async(
+        login_data.password, user.hashed_password
+    )
+    return _check_login(user, password_valid)
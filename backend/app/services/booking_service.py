@@ -1,13 +1,22 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, contains_eager, joinedload, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
 from datetime import datetime, timedelta
 import string
 import random
 from app.models.booking import Booking, BookingStatus
 from app.models.ticket import Ticket
-from app.models.payment import Payment, PaymentStatus
 from app.models.flight import Flight
 from app.models.passenger_profile import PassengerProfile
+from app.core.config import settings
+from app.core.pagination import Page, PageParams, paginate
+from app.services.announcement_inbox import deliver_flight_announcements
+from app.services.change_events import record_change
+from app.services.hold_sweeper import release_expired_holds
+from app.services.resource_versions import touch
+from app.services.seat_counters import adjust_seat_counters
+from app.services.seat_inventory import reserve_seats, release_seats, retry_on_conflict
+from app.services.seat_template import normalize_seat_number
 
 
 def generate_pnr() -> str:
@@ -20,6 +29,7 @@ def generate_ticket_number() -> str:
     return ''.join(random.choices(string.ascii_uppercase + string.digits, k=10))
 
 
+@retry_on_conflict
 def create_booking(
     db: Session,
     user_id: int,
@@ -44,37 +54,10 @@ def create_booking(
             detail="Please complete your passenger profile before booking"
         )
     
-    # Check seat availability and prevent double booking
-    # Also clean up expired seat holds
-    now = datetime.utcnow()
-    expired_bookings = db.query(Booking).filter(
-        Booking.flight_id == flight_id,
-        Booking.status == BookingStatus.CREATED,
-        Booking.seat_hold_expires_at < now
-    ).all()
-    for expired_booking in expired_bookings:
-        expired_booking.status = BookingStatus.CANCELLED
-    
-    booked_seats = set()
-    for ticket in db.query(Ticket).join(Booking).filter(
-        Booking.flight_id == flight_id,
-        Booking.status != BookingStatus.CANCELLED
-    ).all():
-        booked_seats.add(ticket.seat_number)
-    
-    # Validate seats and passenger profiles
+    # Validate passenger profiles
     for passenger_data in passenger_profiles:
-        seat = passenger_data.get("seat_number")
         passenger_profile_id = passenger_data.get("passenger_profile_id")
         
-        # Validate seat
-        if seat in booked_seats:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Seat {seat} is already booked"
-            )
-        booked_seats.add(seat)
-        
         # Validate passenger profile exists and belongs to user
         passenger_profile = db.query(PassengerProfile).filter(
             PassengerProfile.id == passenger_profile_id,
@@ -86,6 +69,17 @@ def create_booking(
                 detail=f"Passenger profile {passenger_profile_id} not found or does not belong to user"
             )
     
+    # Check seat availability and prevent double booking
+    seat_numbers = [normalize_seat_number(p.get("seat_number")) for p in passenger_profiles]
+    try:
+        reserve_seats(db, flight, seat_numbers)
+    except HTTPException:
+        # The seat may be held by an expired booking the sweeper has not reached yet
+        if not release_expired_holds(db, settings.HOLD_SWEEP_BATCH_SIZE, flight_id=flight.id):
+            raise
+        reserve_seats(db, flight, seat_numbers)
+    adjust_seat_counters(db, flight.id, held=len(seat_numbers))
+    
     # Create booking with 10-minute hold
     pnr = generate_pnr()
     while db.query(Booking).filter(Booking.pnr == pnr).first():
@@ -102,22 +96,82 @@ def create_booking(
     db.flush()
     
     # Create tickets
-    for passenger_data in passenger_profiles:
+    for passenger_data, seat_number in zip(passenger_profiles, seat_numbers):
         ticket = Ticket(
             ticket_number=generate_ticket_number(),
             booking_id=booking.id,
             passenger_profile_id=passenger_data["passenger_profile_id"],
-            seat_number=passenger_data["seat_number"]
+            seat_number=seat_number
         )
         db.add(ticket)
+    touch(db, ("trips", user_id))
+    deliver_flight_announcements(db, user_id, flight_id)
     
     db.commit()
     db.refresh(booking)
     return booking
 
 
-def get_user_bookings(db: Session, user_id: int, upcoming_only: bool = False):
-    query = db.query(Booking).filter(Booking.user_id == user_id)
+# Booking read model: listings load bookings with their flight in one query,
+# then all tickets and all payments of the page in one query each
+BOOKING_DETAIL_OPTIONS = (selectinload(Booking.tickets), selectinload(Booking.payment))
+
+
+def booking_to_dict(booking: Booking, include_payment: bool = False) -> dict:
+    result = {
+        "id": booking.id,
+        "pnr": booking.pnr,
+        "user_id": booking.user_id,
+        "flight_id": booking.flight_id,
+        "status": booking.status,
+        "seat_hold_expires_at": booking.seat_hold_expires_at,
+        "created_at": booking.created_at,
+        "flight": {
+            "id": booking.flight.id,
+            "flight_number": booking.flight.flight_number,
+            "scheduled_departure": booking.flight.scheduled_departure,
+            "scheduled_arrival": booking.flight.scheduled_arrival
+        },
+        "tickets": [
+            {
+                "id": t.id,
+                "ticket_number": t.ticket_number,
+                "seat_number": t.seat_number
+            }
+            for t in booking.tickets
+        ]
+    }
+    if include_payment:
+        payment = booking.payment
+        result["payment"] = {
+            "id": payment.id,
+            "amount": payment.amount,
+            "status": payment.status
+        } if payment else None
+    return result
+
+
+def get_bookings(db: Session, flight_id: int, page: PageParams) -> Page:
+    query = db.query(Booking).options(joinedload(Booking.flight), *BOOKING_DETAIL_OPTIONS)
+    if flight_id:
+        query = query.filter(Booking.flight_id == flight_id)
+    return paginate(query, (Booking.id,), page)
+
+
+def list_bookings(db: Session, flight_id: int, page: PageParams) -> Page:
+    bookings = get_bookings(db, flight_id, page)
+    return Page([booking_to_dict(b) for b in bookings.items], bookings.next_cursor)
+
+
+def list_user_bookings(db: Session, user_id: int, upcoming_only: bool, page: PageParams) -> Page:
+    bookings = get_user_bookings(db, user_id, upcoming_only, page)
+    return Page([booking_to_dict(b, include_payment=True) for b in bookings.items], bookings.next_cursor)
+
+
+def get_user_bookings(db: Session, user_id: int, upcoming_only: bool, page: PageParams) -> Page:
+    query = db.query(Booking).filter(Booking.user_id == user_id).options(
+        contains_eager(Booking.flight), *BOOKING_DETAIL_OPTIONS
+    )
     
     if upcoming_only:
         query = query.join(Flight).filter(
@@ -128,9 +182,11 @@ def get_user_bookings(db: Session, user_id: int, upcoming_only: bool = False):
             Flight.scheduled_departure < datetime.utcnow()
         )
     
-    return query.all()
+    # Upcoming trips soonest first, past trips most recent first
+    return paginate(query, (Flight.scheduled_departure, Booking.id), page, descending=not upcoming_only)
 
 
+@retry_on_conflict
 def cancel_booking(db: Session, booking_id: int, user_id: int = None):
     booking = db.query(Booking).filter(Booking.id == booking_id).first()
     if not booking:
@@ -145,7 +201,89 @@ def cancel_booking(db: Session, booking_id: int, user_id: int = None):
             detail="Not authorized to cancel this booking"
         )
     
-    booking.status = BookingStatus.CANCELLED
+    # Conditional UPDATEs, so a booking cancelled concurrently (e.g. by the
+    # hold sweeper) does not release its seats a second time; the one that
+    # matches also tells which seat counter the tickets leave
+    for previous in (BookingStatus.CREATED, BookingStatus.CONFIRMED):
+        cancelled = db.query(Booking).filter(
+            Booking.id == booking_id,
+            Booking.status == previous
+        ).update({Booking.status: BookingStatus.CANCELLED}, synchronize_session=False)
+        if cancelled:
+            seat_numbers = [t.seat_number for t in booking.tickets]
+            release_seats(db, booking.flight, seat_numbers)
+            if previous == BookingStatus.CREATED:
+                adjust_seat_counters(db, booking.flight_id, held=-len(seat_numbers))
+            else:
+                adjust_seat_counters(db, booking.flight_id, booked=-len(seat_numbers))
+            touch(db, ("trips", booking.user_id))
+            record_change(db, Booking, booking.id, {"status": (previous, BookingStatus.CANCELLED)},
+                          {"id": booking.id, "flight_id": booking.flight_id, "user_id": booking.user_id,
+                           "status": BookingStatus.CANCELLED})
+            break
+    db.commit()
+    db.refresh(booking)
+    return booking
+
+
+@retry_on_conflict
+def reassign_seat(db: Session, booking_id: int, ticket_id: int, new_seat: str) -> Ticket:
+    booking = db.query(Booking).filter(Booking.id == booking_id).first()
+    if not booking:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Booking not found"
+        )
+    
+    ticket = db.query(Ticket).filter(
+        Ticket.id == ticket_id,
+        Ticket.booking_id == booking_id
+    ).first()
+    if not ticket:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Ticket not found"
+        )
+    
+    new_seat = normalize_seat_number(new_seat)
+    # Check if new seat is available and move the ticket in the seat inventory
+    if booking.status != BookingStatus.CANCELLED and new_seat != ticket.seat_number:
+        reserve_seats(db, booking.flight, [new_seat])
+        release_seats(db, booking.flight, [ticket.seat_number])
+    
+    ticket.seat_number = new_seat
+    touch(db, ("flight", booking.flight_id), ("trips", booking.user_id))
     db.commit()
+    db.refresh(ticket)
+    return ticket
+
+
+async def create_booking_async(
+    db: AsyncSession,
+    user_id: int,
+    flight_id: int,
+    passenger_profiles: list
+) -> Booking:
+    booking = await db.run_sync(create_booking, user_id, flight_id, passenger_profiles)
+    await db.refresh(booking, ["flight", "tickets"])
     return booking
 
+
+async def get_user_bookings_async(db: AsyncSession, user_id: int, upcoming_only: bool, page: PageParams) -> Page:
+    return await db.run_sync(get_user_bookings, user_id, upcoming_only, page)
+
+
+async def list_bookings_async(db: AsyncSession, flight_id: int, page: PageParams) -> Page:
+    return await db.run_sync(list_bookings, flight_id, page)
+
+
+async def list_user_bookings_async(db: AsyncSession, user_id: int, upcoming_only: bool, page: PageParams) -> Page:
+    return await db.run_sync(list_user_bookings, user_id, upcoming_only, page)
+
+
+async def cancel_booking_async(db: AsyncSession, booking_id: int, user_id: int = None):
+    return await db.run_sync(cancel_booking, booking_id, user_id)
+
+
+async def reassign_seat_async(db: AsyncSession, booking_id: int, ticket_id: int, new_seat: str) -> Ticket:
+    return await db.run_sync(reassign_seat, booking_id, ticket_id, new_seat)
@@ -0,0 +1,213 @@
+"""
+Change events for flights, bookings and payments.
+
+Every committed change to one of these rows becomes a `ChangeEvent` naming
+the model, the row id, the action and the old and new value of each changed
+column. Components subscribe per model instead of polling or scanning:
+
+    change_bus.subscribe(Flight, on_flight_change)
+
+ORM writes are captured by mapper events during the flush. Services that
+change rows with bulk UPDATEs (booking status moves) call `record_change`
+themselves; seat counter UPDATEs are not reported, they follow from the
+booking events. The old value of a column is None when the row was not
+loaded before it changed.
+
+Events are collected per session and published once it commits, in the order
+they were recorded; a rollback drops them. Delivery is in one process-wide
+order: every event gets the next sequence number, and events published while
+subscribers are still running (e.g. by a subscriber's own commit, or another
+thread) are queued behind the ones already being delivered. Subscribers run
+synchronously in the committing thread, so they should hand slow work to a
+background task; an exception is logged and does not stop delivery.
+
+With CHANGE_OUTBOX the events are also inserted into `change_outbox` by the
+transaction that made the change, for consumers in other processes.
+"""
+import enum
+import itertools
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event, inspect, insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+from app.core import metrics
+from app.core.commit_hooks import on_commit, pending
+from app.core.config import settings
+from app.core.pagination import Page, PageParams, paginate
+from app.models.booking import Booking
+from app.models.change_outbox import OutboxEvent
+from app.models.flight import Flight
+from app.models.payment import Payment
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeAction(str, enum.Enum):
+    CREATED = "created"
+    UPDATED = "updated"
+    DELETED = "deleted"
+
+
+class ChangeEvent(NamedTuple):
+    sequence: int  # Position in the process-wide delivery order
+    model: type  # Flight, Booking or Payment
+    entity_id: int
+    action: ChangeAction
+    changes: Dict[str, Tuple[Any, Any]]  # Column -> (old, new)
+    row: Dict[str, Any]  # Column values known after the change
+    committed_at: datetime
+
+
+Handler = Callable[[ChangeEvent], None]
+
+
+class ChangeBus:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sequence = itertools.count(1)
+        self._subscribers: Dict[type, List[Handler]] = {}
+        self._pending: Deque[ChangeEvent] = deque()
+        self._delivering = False
+        self.published = 0
+        self.delivered = 0
+        self.errors = 0
+
+    def subscribe(self, model: type, handler: Handler) -> Handler:
+        with self._lock:
+            self._subscribers.setdefault(model, []).append(handler)
+        return handler
+
+    def unsubscribe(self, model: type, handler: Handler) -> None:
+        with self._lock:
+            handlers = self._subscribers.get(model, [])
+            if handler in handlers:
+                handlers.remove(handler)
+
+    def publish(self, changes: List[tuple]) -> None:
+        """Deliver committed changes, given as ChangeEvent fields after `sequence`, in order"""
+        with self._lock:
+            for change in changes:
+                self._pending.append(ChangeEvent(next(self._sequence), *change))
+            self.published += len(changes)
+            if self._delivering:
+                # Whoever is delivering gets to these next
+                return
+            self._delivering = True
+        try:
+            while True:
+                with self._lock:
+                    if not self._pending:
+                        self._delivering = False
+                        return
+                    change_event = self._pending.popleft()
+                    handlers = list(self._subscribers.get(change_event.model, ()))
+                self._deliver(change_event, handlers)
+        except BaseException:
+            with self._lock:
+                self._delivering = False
+            raise
+
+    def _deliver(self, change_event: ChangeEvent, handlers: List[Handler]) -> None:
+        for handler in handlers:
+            try:
+                handler(change_event)
+                self.delivered += 1
+            except Exception:
+                self.errors += 1
+                logger.exception("Change event subscriber failed")
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": {model.__tablename__: len(handlers) for model, handlers in self._subscribers.items()},
+            "published": self.published,
+            "delivered": self.delivered,
+            "errors": self.errors,
+        }
+
+
+change_bus = ChangeBus()
+metrics.register("change_bus", change_bus.stats)
+
+
+def _record(session: Optional[Session], connection: Connection, model: type, entity_id: int,
+            action: ChangeAction, changes: Dict[str, Tuple[Any, Any]], row: Dict[str, Any]) -> None:
+    if session is None:
+        return
+    pending(session, "change_events", list).append((model, entity_id, action, changes, row))
+    if settings.CHANGE_OUTBOX:
+        connection.execute(insert(OutboxEvent).values(
+            entity=model.__tablename__,
+            entity_id=entity_id,
+            action=action.value,
+            changes=jsonable_encoder({column: list(values) for column, values in changes.items()}),
+            row=jsonable_encoder(row)
+        ))
+
+
+def record_change(db: Session, model: type, entity_id: int, changes: Dict[str, Tuple[Any, Any]],
+                  row: Optional[Dict[str, Any]] = None) -> None:
+    """Report an update made without the ORM (e.g. a bulk UPDATE); published when `db` commits"""
+    _record(db, db.connection(), model, entity_id, ChangeAction.UPDATED, changes, row or {})
+
+
+def _loaded_columns(target) -> Dict[str, Any]:
+    state = inspect(target)
+    # Only what is loaded; reading an expired column here would query mid-flush
+    return {attr.key: state.dict[attr.key] for attr in state.mapper.column_attrs if attr.key in state.dict}
+
+
+@event.listens_for(Flight, "after_insert")
+@event.listens_for(Booking, "after_insert")
+@event.listens_for(Payment, "after_insert")
+def _capture_insert(mapper, connection, target):
+    row = _loaded_columns(target)
+    changes = {column: (None, value) for column, value in row.items()}
+    _record(object_session(target), connection, mapper.class_, target.id, ChangeAction.CREATED, changes, row)
+
+
+@event.listens_for(Flight, "after_update")
+@event.listens_for(Booking, "after_update")
+@event.listens_for(Payment, "after_update")
+def _capture_update(mapper, connection, target):
+    state = inspect(target)
+    changes = {}
+    for attr in mapper.column_attrs:
+        history = state.attrs[attr.key].history
+        if history.added or history.deleted:
+            changes[attr.key] = (history.deleted[0] if history.deleted else None,
+                                 history.added[0] if history.added else None)
+    if changes:
+        _record(object_session(target), connection, mapper.class_, target.id, ChangeAction.UPDATED,
+                changes, _loaded_columns(target))
+
+
+@event.listens_for(Flight, "after_delete")
+@event.listens_for(Booking, "after_delete")
+@event.listens_for(Payment, "after_delete")
+def _capture_delete(mapper, connection, target):
+    row = _loaded_columns(target)
+    changes = {column: (value, None) for column, value in row.items()}
+    _record(object_session(target), connection, mapper.class_, target.id, ChangeAction.DELETED, changes, row)
+
+
+@on_commit("change_events")
+def _publish_committed_changes(changes):
+    if changes:
+        committed_at = datetime.utcnow()
+        change_bus.publish([(*change, committed_at) for change in changes])
+
+
+def list_outbox(db: Session, page: PageParams) -> Page:
+    """Outbox events in commit order"""
+    return paginate(db.query(OutboxEvent), (OutboxEvent.id,), page)
+
+
+async def list_outbox_async(db: AsyncSession, page: PageParams) -> Page:
+    return await db.run_sync(list_outbox, page)
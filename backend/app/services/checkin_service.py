@@ -1,4 +1,5 @@
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
 from datetime import datetime, timedelta
 import json
@@ -87,3 +88,10 @@ def check_in(
     db.refresh(checkin)
     return checkin
 
+
+async def check_in_async(
+    db: AsyncSession,
+    ticket_id: int,
+    user_id: int
+) -> CheckIn:
+    return await db.run_sync(check_in, ticket_id, user_id)
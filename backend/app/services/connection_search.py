@@ -0,0 +1,319 @@
+"""
+Multi-leg connection search.
+
+Flights are kept in memory as a time-expanded graph: for every airport, its
+departures sorted by time, plus every route's departures sorted by time. From
+a leg arriving at an airport at time t, the legs that connect are the
+departures in [t + min connection, t + max connection], found by bisection.
+The last leg of an itinerary is looked up on the route to the destination
+directly, so the search never fans out at the final hop.
+
+Itineraries never revisit an airport and are ranked by arrival time, then
+number of legs, then latest departure (shortest trip). The search keeps only
+the best `limit` itineraries found so far and prunes on the arrival of the
+worst of them: a leg departing after it, or an unfinished trip that cannot
+reach the destination before it (going by the shortest flights on the
+remaining routes), is not extended. The graph is loaded
+once at startup and kept current by the flight create/update services, like
+the flight search index. Cancelled flights are left out.
+"""
+import heapq
+import itertools
+import threading
+from bisect import bisect_left, insort
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+from app.core import metrics
+from app.models.airport import Airport
+from app.models.flight import Flight, FlightStatus
+from app.services.flight_search_index import FlightRecord
+
+Itinerary = Tuple[FlightRecord, ...]
+
+
+def _departure(record: FlightRecord):
+    return record.scheduled_departure
+
+
+def _sort_key(record: FlightRecord):
+    return record.scheduled_departure, record.id
+
+
+def _window(legs: Optional[List[FlightRecord]], earliest: datetime, latest: datetime) -> List[FlightRecord]:
+    """Legs departing in [earliest, latest]; `legs` must be in departure order"""
+    if not legs:
+        return []
+    start = bisect_left(legs, earliest, key=_departure)
+    end = bisect_left(legs, latest + timedelta(microseconds=1), key=_departure, lo=start)
+    return legs[start:end]
+
+
+def _rank(itinerary: Itinerary):
+    return itinerary[-1].scheduled_arrival, len(itinerary), -itinerary[0].scheduled_departure.timestamp()
+
+
+def _shortest_flight(legs: List[FlightRecord]) -> timedelta:
+    return min(leg.scheduled_arrival - leg.scheduled_departure for leg in legs)
+
+
+def _inverse_rank(itinerary: Itinerary):
+    # Heap key that puts the worst itinerary first
+    return (-itinerary[-1].scheduled_arrival.timestamp(), -len(itinerary),
+            itinerary[0].scheduled_departure.timestamp())
+
+
+class ConnectionGraph:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._airport_ids: Dict[str, int] = {}
+        self._airport_codes: Dict[int, str] = {}
+        # Lists are replaced, never mutated, so searches need no lock
+        self._departures: Dict[int, List[FlightRecord]] = {}
+        self._routes: Dict[Tuple[int, int], List[FlightRecord]] = {}
+        # Shortest flight time on each route, a lower bound for a trip's last leg
+        self._shortest: Dict[Tuple[int, int], timedelta] = {}
+        self._origins: Dict[int, Set[int]] = {}  # Airport -> airports with a route to it
+        self._records: Dict[int, FlightRecord] = {}
+        self.ready = False
+        self.searches = 0
+        self.itineraries_returned = 0
+
+    def load(self, db: Session) -> None:
+        """(Re)build the whole graph from the database"""
+        codes = dict(db.query(Airport.id, Airport.code))
+        columns = [getattr(Flight, field) for field in FlightRecord._fields]
+        departures: Dict[int, List[FlightRecord]] = {}
+        routes: Dict[Tuple[int, int], List[FlightRecord]] = {}
+        records = {}
+        query = db.query(*columns).filter(Flight.status != FlightStatus.CANCELLED)
+        for row in query.yield_per(10_000):
+            record = FlightRecord(*row)
+            records[record.id] = record
+            departures.setdefault(record.origin_id, []).append(record)
+            routes.setdefault((record.origin_id, record.destination_id), []).append(record)
+        for legs in (*departures.values(), *routes.values()):
+            legs.sort(key=_sort_key)
+        shortest = {route: _shortest_flight(legs) for route, legs in routes.items()}
+        with self._lock:
+            self._airport_codes = codes
+            self._airport_ids = {code: airport_id for airport_id, code in codes.items()}
+            self._departures, self._routes, self._records = departures, routes, records
+            self._shortest = shortest
+            self._origins = {}
+            for origin_id, destination_id in shortest:
+                self._origins.setdefault(destination_id, set()).add(origin_id)
+            self.ready = True
+
+    @staticmethod
+    def _without(legs: List[FlightRecord], flight_id: int) -> List[FlightRecord]:
+        return [leg for leg in legs if leg.id != flight_id]
+
+    def _remove(self, flight_id: int) -> None:
+        record = self._records.pop(flight_id, None)
+        if record is None:
+            return
+        route = (record.origin_id, record.destination_id)
+        self._departures[record.origin_id] = self._without(self._departures[record.origin_id], flight_id)
+        self._routes[route] = self._without(self._routes[route], flight_id)
+        self._set_shortest(route)
+
+    def _set_shortest(self, route: Tuple[int, int]) -> None:
+        origin_id, destination_id = route
+        origins = set(self._origins.get(destination_id, ()))
+        if self._routes.get(route):
+            self._shortest[route] = _shortest_flight(self._routes[route])
+            origins.add(origin_id)
+        else:
+            self._shortest.pop(route, None)
+            origins.discard(origin_id)
+        # Replaced, not mutated, like the leg lists
+        self._origins[destination_id] = origins
+
+    def _two_leg_bounds(self, destination_id: int, min_connection: timedelta) -> Dict[int, timedelta]:
+        """Airport -> shortest flying plus connection time of any two-leg trip from it to the destination"""
+        bounds: Dict[int, timedelta] = {}
+        # Searches run alongside upserts, so a route may have gone since its origin was listed
+        shortest = self._shortest
+        for via in self._origins.get(destination_id, ()):
+            last = shortest.get((via, destination_id))
+            if last is None:
+                continue
+            for airport_id in self._origins.get(via, ()):
+                first = shortest.get((airport_id, via))
+                if first is None:
+                    continue
+                bound = first + min_connection + last
+                if airport_id not in bounds or bound < bounds[airport_id]:
+                    bounds[airport_id] = bound
+        return bounds
+
+    def _add(self, record: FlightRecord) -> None:
+        for legs, key in ((self._departures, record.origin_id),
+                          (self._routes, (record.origin_id, record.destination_id))):
+            updated = list(legs.get(key, ()))
+            insort(updated, record, key=_sort_key)
+            legs[key] = updated
+        self._set_shortest((record.origin_id, record.destination_id))
+        self._records[record.id] = record
+
+    def upsert(self, db: Session, flight: Flight) -> None:
+        """Record a created, rescheduled or cancelled flight; call after the change is committed"""
+        if not self.ready:
+            return
+        record = FlightRecord(*(getattr(flight, field) for field in FlightRecord._fields))
+        with self._lock:
+            for airport_id in (record.origin_id, record.destination_id):
+                if airport_id not in self._airport_codes:
+                    code = db.get(Airport, airport_id).code
+                    self._airport_codes[airport_id] = code
+                    self._airport_ids[code] = airport_id
+            self._remove(record.id)
+            if record.status != FlightStatus.CANCELLED:
+                self._add(record)
+
+    def airport_code(self, airport_id: int) -> str:
+        return self._airport_codes[airport_id]
+
+    def search(self, origin: str, destination: str, day: date, max_legs: int,
+               min_connection: timedelta, max_connection: timedelta, limit: int) -> List[Itinerary]:
+        """Best `limit` itineraries whose first leg departs on `day`"""
+        origin_id = self._airport_ids.get(origin.upper())
+        destination_id = self._airport_ids.get(destination.upper())
+        if origin_id is None or destination_id is None:
+            missing = origin if origin_id is None else destination
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Airport {missing.upper()} not found"
+            )
+        self.searches += 1
+        if origin_id == destination_id:
+            return []
+
+        # The best `limit` itineraries so far, worst first
+        best: List[Tuple[tuple, int, Itinerary]] = []
+        cutoff: List[Optional[datetime]] = [None]  # Arrival of the worst once `limit` are found
+        path: List[FlightRecord] = []
+        visited = {origin_id}
+        tiebreak = itertools.count()
+        two_leg_bounds: List[Optional[Dict[int, timedelta]]] = [None]  # Built once there is a cutoff
+
+        def offer(itinerary: Itinerary) -> None:
+            entry = (_inverse_rank(itinerary), next(tiebreak), itinerary)
+            if len(best) < limit:
+                heapq.heappush(best, entry)
+            elif entry[0] > best[0][0]:
+                heapq.heapreplace(best, entry)
+            else:
+                return
+            if len(best) == limit:
+                cutoff[0] = best[0][2][-1].scheduled_arrival
+
+        def extend(candidates: List[FlightRecord], legs: int) -> None:
+            """Continue `path` with each candidate into trips of exactly `legs` legs"""
+            remaining = legs - len(path)
+            for leg in candidates:
+                # Candidates come in departure order and every leg arrives after it departs
+                if cutoff[0] is not None and leg.scheduled_departure >= cutoff[0]:
+                    break
+                if remaining == 1:
+                    # Final legs are taken from the route to the destination
+                    offer((*path, leg))
+                    continue
+                if leg.destination_id in visited or leg.destination_id == destination_id:
+                    # Shorter trips were found by an earlier pass
+                    continue
+                # The next leg departs min_connection after this one lands at the earliest
+                earliest = leg.scheduled_arrival + min_connection
+                latest = leg.scheduled_arrival + max_connection
+                if remaining == 2:
+                    # The next leg is the last one, on the route to the destination
+                    route = (leg.destination_id, destination_id)
+                    shortest = self._shortest.get(route)
+                    if shortest is None or (cutoff[0] is not None and earliest + shortest > cutoff[0]):
+                        continue
+                    following = _window(self._routes[route], earliest, latest)
+                else:
+                    if cutoff[0] is not None and remaining == 3:
+                        if two_leg_bounds[0] is None:
+                            two_leg_bounds[0] = self._two_leg_bounds(destination_id, min_connection)
+                        bound = two_leg_bounds[0].get(leg.destination_id)
+                        if bound is None or earliest + bound > cutoff[0]:
+                            continue
+                    elif cutoff[0] is not None and earliest >= cutoff[0]:
+                        continue
+                    following = _window(self._departures.get(leg.destination_id), earliest, latest)
+                path.append(leg)
+                visited.add(leg.destination_id)
+                extend(following, legs)
+                visited.discard(leg.destination_id)
+                path.pop()
+
+        # Fewer legs first: direct flights and one-stop trips set a cutoff for the wider searches
+        start = datetime.combine(day, datetime.min.time())
+        end = start + timedelta(days=1) - timedelta(microseconds=1)
+        for legs in range(1, max_legs + 1):
+            first_legs = self._routes.get((origin_id, destination_id)) if legs == 1 else self._departures.get(origin_id)
+            extend(_window(first_legs, start, end), legs)
+
+        itineraries = sorted((itinerary for _, _, itinerary in best), key=_rank)
+        self.itineraries_returned += len(itineraries)
+        return itineraries
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "flights": len(self._records),
+            "airports": len(self._departures),
+            "searches": self.searches,
+            "itineraries_returned": self.itineraries_returned,
+        }
+
+
+connection_graph = ConnectionGraph()
+metrics.register("connection_graph", connection_graph.stats)
+
+
+def _minutes(delta: timedelta) -> int:
+    return round(delta.total_seconds() / 60)
+
+
+def itinerary_to_dict(itinerary: Itinerary) -> dict:
+    code = connection_graph.airport_code
+    first, last = itinerary[0], itinerary[-1]
+    return {
+        "legs": [
+            {**leg._asdict(), "origin_code": code(leg.origin_id), "destination_code": code(leg.destination_id)}
+            for leg in itinerary
+        ],
+        "departure": first.scheduled_departure,
+        "arrival": last.scheduled_arrival,
+        "duration_minutes": _minutes(last.scheduled_arrival - first.scheduled_departure),
+        "stops": len(itinerary) - 1,
+        "layover_minutes": [
+            _minutes(following.scheduled_departure - leg.scheduled_arrival)
+            for leg, following in zip(itinerary, itinerary[1:])
+        ],
+    }
+
+
+def search_connections(origin: str, destination: str, day: date, max_legs: int,
+                       min_connection_minutes: int, max_connection_minutes: int, limit: int) -> List[dict]:
+    if not connection_graph.ready:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Connection search is not available"
+        )
+    if min_connection_minutes > max_connection_minutes:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Minimum connection time exceeds the maximum"
+        )
+    itineraries = connection_graph.search(
+        origin, destination, day, max_legs,
+        timedelta(minutes=min_connection_minutes), timedelta(minutes=max_connection_minutes), limit
+    )
+    return [itinerary_to_dict(itinerary) for itinerary in itineraries]
+
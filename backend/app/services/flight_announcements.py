@@ -0,0 +1,135 @@
+"""
+Announcements: delivery, and the ones raised by flight changes.
+
+`announce` saves an announcement, pushes it to open streams and queues its
+inbox fan-out; staff announcements and automatic ones both go through it.
+
+The flight announcer subscribes to flight change events. A new gate or
+terminal, a departure moved later by at least DELAY_ANNOUNCEMENT_MINUTES (or
+a DELAYED status), boarding and cancellation each become an announcement.
+Events are delivered in the committing thread, so the announcer only queues
+them to a worker on the event loop, which creates the announcements in their
+own transactions. It runs between the app lifespan's start and stop; changes
+committed outside it (scripts, other processes) are not announced.
+"""
+import asyncio
+import logging
+from datetime import timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core import metrics
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, naive_utc
+from app.models.announcement import Announcement, AnnouncementType
+from app.models.flight import Flight, FlightStatus
+from app.services.announcement_hub import announcement_hub, announcement_to_dict
+from app.services.announcement_inbox import inbox_fanout
+from app.services.change_events import ChangeAction, ChangeEvent, change_bus
+
+logger = logging.getLogger(__name__)
+
+
+async def announce(db: AsyncSession, flight: Flight, announcement_type: AnnouncementType, message: str) -> dict:
+    """Create an announcement and deliver it to the flight's passengers"""
+    announcement = Announcement(flight_id=flight.id, announcement_type=announcement_type, message=message)
+    db.add(announcement)
+    await db.commit()
+    await db.refresh(announcement)
+
+    result = announcement_to_dict(announcement, flight.flight_number)
+    announcement_hub.publish(result)
+    # Passenger inboxes are filled in the background
+    inbox_fanout.submit(announcement.id)
+    return result
+
+
+def _gate_message(row: dict) -> Optional[str]:
+    where = [f"{label} {row[column]}" for column, label in (("terminal", "terminal"), ("gate", "gate"))
+             if row.get(column)]
+    return f"Now departing from {', '.join(where)}" if where else None
+
+
+def flight_change_announcements(change: ChangeEvent) -> List[Tuple[AnnouncementType, str]]:
+    """(type, message) of each announcement a flight update calls for"""
+    changes, row = change.changes, change.row
+    new_status = changes["status"][1] if "status" in changes else None
+    if new_status == FlightStatus.CANCELLED:
+        return [(AnnouncementType.CANCELLATION, "This flight has been cancelled")]
+
+    announcements = []
+    if "gate" in changes or "terminal" in changes:
+        message = _gate_message(row)
+        if message:
+            announcements.append((AnnouncementType.GATE_CHANGE, message))
+
+    old_departure, new_departure = map(naive_utc, changes.get("scheduled_departure", (None, None)))
+    if (old_departure and new_departure
+            and new_departure - old_departure >= timedelta(minutes=settings.DELAY_ANNOUNCEMENT_MINUTES)):
+        announcements.append((
+            AnnouncementType.DELAY,
+            f"Departure delayed to {new_departure:%Y-%m-%d %H:%M} (was {old_departure:%H:%M})"
+        ))
+    elif new_status == FlightStatus.DELAYED:
+        announcements.append((AnnouncementType.DELAY, "This flight is delayed"))
+
+    if new_status == FlightStatus.BOARDING:
+        announcements.append((AnnouncementType.BOARDING, "Boarding has started"))
+    return announcements
+
+
+class FlightAnnouncer:
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.created = 0
+        self.errors = 0
+
+    def on_flight_change(self, change: ChangeEvent) -> None:
+        if change.action != ChangeAction.UPDATED:
+            return
+        for announcement_type, message in flight_change_announcements(change):
+            # May run in a thread other than the event loop's
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, (change.entity_id, announcement_type, message))
+
+    async def _run(self) -> None:
+        while True:
+            flight_id, announcement_type, message = await self._queue.get()
+            try:
+                async with AsyncSessionLocal() as db:
+                    flight = await db.get(Flight, flight_id)
+                    if flight is not None:
+                        await announce(db, flight, announcement_type, message)
+                        self.created += 1
+            except Exception:
+                self.errors += 1
+                logger.exception("Automatic announcement failed")
+
+    def start(self) -> None:
+        if settings.AUTO_ANNOUNCEMENTS and self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+            change_bus.subscribe(Flight, self.on_flight_change)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            change_bus.unsubscribe(Flight, self.on_flight_change)
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "created": self.created,
+            "errors": self.errors,
+        }
+
+
+flight_announcer = FlightAnnouncer()
+metrics.register("flight_announcer", flight_announcer.stats)
@@ -0,0 +1,118 @@
+"""
+Flexible-date availability calendar.
+
+For one route, every departure day gets its number of flights, the earliest
+departure and the lowest and highest seats left on any flight that day;
+cancelled flights are left out. The requested window is aggregated in one
+grouped query over `flights` (seat counts are the counters on each flight)
+and cached per route and window.
+
+Entries are keyed by the route's version (see `resource_versions`), which
+moves once a change to one of its flights, or a booking change that moves a
+flight's seat counters, commits. Later requests miss and superseded entries
+age out, like the search cache's.
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import event, func, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.airport import Airport
+from app.models.flight import Flight, FlightStatus
+from app.services.resource_versions import resource_versions, touch
+
+RouteKey = Tuple[int, int]
+
+
+class CalendarDay(NamedTuple):
+    flights: int
+    earliest_departure: datetime
+    min_seats_available: int
+    max_seats_available: int
+
+
+# (origin id, destination id, first day, last day, route version) -> departure date -> CalendarDay
+calendar_cache = TTLCache(maxsize=settings.CALENDAR_CACHE_MAX_SIZE, ttl=settings.CALENDAR_CACHE_TTL_SECONDS)
+metrics.register("calendar_cache", calendar_cache.stats)
+
+
+def _route_days(db: Session, route: RouteKey, first: date, last: date) -> Dict[date, CalendarDay]:
+    key = (*route, first, last, resource_versions.current(("route", *route)))
+    days = calendar_cache.get(key)
+    if days is not None:
+        return days
+    day = func.date(Flight.scheduled_departure)
+    rows = db.query(
+        day,
+        func.count(Flight.id),
+        func.min(Flight.scheduled_departure),
+        func.min(Flight.seats_available),
+        func.max(Flight.seats_available),
+    ).filter(
+        Flight.origin_id == route[0],
+        Flight.destination_id == route[1],
+        Flight.scheduled_departure >= datetime.combine(first, time.min),
+        Flight.scheduled_departure < datetime.combine(last + timedelta(days=1), time.min),
+        Flight.status != FlightStatus.CANCELLED
+    ).group_by(day).all()
+    days = {date.fromisoformat(row[0]): CalendarDay(*row[1:]) for row in rows}
+    calendar_cache.set(key, days)
+    return days
+
+
+def _airport_id(db: Session, code: str) -> int:
+    airport_id = db.query(Airport.id).filter(Airport.code == code.upper()).scalar()
+    if airport_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Airport {code.upper()} not found"
+        )
+    return airport_id
+
+
+def get_flight_calendar(db: Session, origin: str, destination: str, center: date, days: int) -> dict:
+    """Per-day availability on a route for `center` +/- `days`"""
+    route = (_airport_id(db, origin), _airport_id(db, destination))
+    route_days = _route_days(db, route, center - timedelta(days=days), center + timedelta(days=days))
+    calendar = []
+    for offset in range(-days, days + 1):
+        day = center + timedelta(days=offset)
+        found = route_days.get(day)
+        calendar.append({
+            "date": day,
+            "flights": found.flights if found else 0,
+            "earliest_departure": found.earliest_departure if found else None,
+            "min_seats_available": found.min_seats_available if found else None,
+            "max_seats_available": found.max_seats_available if found else None,
+        })
+    return {"origin": origin.upper(), "destination": destination.upper(), "days": calendar}
+
+
+def invalidate_route(db: Optional[Session], origin_id: int, destination_id: int) -> None:
+    """Move the route's version once `db` commits, retiring its calendars and search pages"""
+    touch(db, ("route", origin_id, destination_id))
+
+
+@event.listens_for(Flight, "after_insert")
+@event.listens_for(Flight, "after_update")
+@event.listens_for(Flight, "after_delete")
+def _invalidate_changed_flight(mapper, connection, target):
+    session = object_session(target)
+    invalidate_route(session, target.origin_id, target.destination_id)
+    # A flight moved to another route also leaves its old one
+    state = inspect(target)
+    old_origin = state.attrs.origin_id.history.deleted
+    old_destination = state.attrs.destination_id.history.deleted
+    if old_origin or old_destination:
+        invalidate_route(session, (old_origin or [target.origin_id])[0],
+                         (old_destination or [target.destination_id])[0])
+
+
+async def get_flight_calendar_async(db: AsyncSession, origin: str, destination: str,
+                                    center: date, days: int) -> dict:
+    return await db.run_sync(get_flight_calendar, origin, destination, center, days)
@@ -0,0 +1,141 @@
+"""
+In-memory index for flight search.
+
+Flights are held as compact tuples keyed by origin code, destination code and
+departure date, so a route search is answered with dictionary lookups instead
+of three SQLite queries. The index is loaded once at startup and kept current
+by the flight create/update services. Anything it cannot answer (not loaded
+yet, missing route, unknown airport code) falls back to the database.
+
+The index is per process: flights changed by another process or outside the
+services only show up after a restart.
+"""
+import threading
+from bisect import insort
+from collections import namedtuple
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+from app.core import metrics
+from app.models.airport import Airport
+from app.models.flight import Flight
+
+# Same fields as FlightResponse, so records serialize like ORM flights
+FlightRecord = namedtuple("FlightRecord", [
+    "id", "flight_number", "origin_id", "destination_id", "airplane_id",
+    "scheduled_departure", "scheduled_arrival", "gate", "terminal", "status", "created_at",
+])
+
+RouteKey = Tuple[str, str]
+
+
+def _sort_key(record: FlightRecord):
+    return record.scheduled_departure, record.id
+
+
+class FlightSearchIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._airport_codes: Dict[int, str] = {}
+        self._known_codes = set()
+        # (origin code, destination code) -> departure date -> records by departure time
+        self._routes: Dict[RouteKey, Dict[date, List[FlightRecord]]] = {}
+        self._records: Dict[int, FlightRecord] = {}
+        self.ready = False
+        self.hits = 0
+        self.fallbacks = 0
+
+    def _key(self, record: FlightRecord) -> Tuple[RouteKey, date]:
+        route = (self._airport_codes[record.origin_id], self._airport_codes[record.destination_id])
+        return route, record.scheduled_departure.date()
+
+    def _add(self, record: FlightRecord) -> None:
+        route, day = self._key(record)
+        # Buckets are replaced, never mutated, so readers need no lock
+        by_date = self._routes.setdefault(route, {})
+        bucket = list(by_date.get(day, ()))
+        insort(bucket, record, key=_sort_key)
+        by_date[day] = bucket
+        self._records[record.id] = record
+
+    def _remove(self, flight_id: int) -> None:
+        record = self._records.pop(flight_id, None)
+        if record is None:
+            return
+        route, day = self._key(record)
+        by_date = self._routes[route]
+        bucket = [r for r in by_date[day] if r.id != flight_id]
+        if bucket:
+            by_date[day] = bucket
+        else:
+            del by_date[day]
+
+    def load(self, db: Session) -> None:
+        """(Re)build the whole index from the database"""
+        codes = dict(db.query(Airport.id, Airport.code))
+        columns = [getattr(Flight, field) for field in FlightRecord._fields]
+        routes: Dict[RouteKey, Dict[date, List[FlightRecord]]] = {}
+        records = {}
+        for row in db.query(*columns).yield_per(10_000):
+            record = FlightRecord(*row)
+            records[record.id] = record
+            route = (codes[record.origin_id], codes[record.destination_id])
+            routes.setdefault(route, {}).setdefault(record.scheduled_departure.date(), []).append(record)
+        for by_date in routes.values():
+            for bucket in by_date.values():
+                bucket.sort(key=_sort_key)
+        with self._lock:
+            self._airport_codes, self._routes, self._records = codes, routes, records
+            self._known_codes = set(codes.values())
+            self.ready = True
+
+    def upsert(self, db: Session, flight: Flight) -> None:
+        """Record a created or updated flight; call after the change is committed"""
+        if not self.ready:
+            return
+        record = FlightRecord(*(getattr(flight, field) for field in FlightRecord._fields))
+        with self._lock:
+            for airport_id in (record.origin_id, record.destination_id):
+                if airport_id not in self._airport_codes:
+                    code = db.get(Airport, airport_id).code
+                    self._airport_codes[airport_id] = code
+                    self._known_codes.add(code)
+            self._remove(record.id)
+            self._add(record)
+
+    def airport_code(self, airport_id: int) -> str:
+        return self._airport_codes[airport_id]
+
+    def search(self, origin: Optional[str], destination: Optional[str],
+               departure: Optional[datetime]) -> Optional[List[FlightRecord]]:
+        """Flights on a route (and day), or None if the database has to answer"""
+        if not (self.ready and origin and destination):
+            self.fallbacks += 1
+            return None
+        route = (origin.upper(), destination.upper())
+        by_date = self._routes.get(route)
+        if by_date is None:
+            # Unknown codes are ignored by the database search, so let it decide
+            if route[0] not in self._known_codes or route[1] not in self._known_codes:
+                self.fallbacks += 1
+                return None
+            self.hits += 1
+            return []
+        self.hits += 1
+        if departure is not None:
+            return list(by_date.get(departure.date(), ()))
+        return sorted((r for bucket in list(by_date.values()) for r in bucket), key=_sort_key)
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "flights": len(self._records),
+            "routes": len(self._routes),
+            "hits": self.hits,
+            "fallbacks": self.fallbacks,
+        }
+
+
+flight_search_index = FlightSearchIndex()
+metrics.register("flight_search_index", flight_search_index.stats)
@@ -1,18 +1,138 @@
-from sqlalchemy.orm import Session
+import base64
+from itertools import groupby
+from typing import List, Optional
+from sqlalchemy import Integer, cast, func
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
 from datetime import datetime, timedelta
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.single_flight import SingleFlight
+from app.core.pagination import Page, PageParams, paginate, paginate_list, paginate_top
 from app.models.flight import Flight
 from app.models.airport import Airport
-from app.models.ticket import Ticket
-from app.models.booking import Booking, BookingStatus
-from app.schemas.flight import FlightSearch
+from app.schemas.flight import FlightSearch, FlightSearchSort, FlightCreate, FlightUpdate, SeatMapFormat
+from app.services.airport_index import airport_index
+from app.services.connection_search import connection_graph
+from app.services.flight_search_index import FlightRecord, flight_search_index
+from app.services.resource_versions import resource_versions, touch
+from app.services.seat_counters import reset_seat_counters
+from app.services.seat_inventory import (
+    get_inventory,
+    rebuild_inventory,
+    retry_on_conflict,
+)
+from app.services.seat_template import seat_template_for
+
+
+# Whole minutes between departure and arrival, as SQLite computes it
+FLIGHT_DURATION = cast(func.round(
+    (func.julianday(Flight.scheduled_arrival) - func.julianday(Flight.scheduled_departure)) * 1440
+), Integer)
+
+# Sort key columns per search order, the last one unique; seats left sorts
+# most seats first, the others ascending
+SEARCH_ORDERS = {
+    FlightSearchSort.DEPARTURE: (Flight.scheduled_departure, Flight.id),
+    FlightSearchSort.DURATION: (FLIGHT_DURATION, Flight.scheduled_departure, Flight.id),
+    FlightSearchSort.SEATS_LEFT: (Flight.seats_available, Flight.id),
+}
+
+# Route search pages and flight details, keyed by their normalized parameters
+# plus the version of the route or flight they show. A write moves the
+# version, so later requests miss and superseded entries age out.
+search_cache = TTLCache(maxsize=settings.RESPONSE_CACHE_MAX_SIZE, ttl=settings.RESPONSE_CACHE_TTL_SECONDS)
+details_cache = TTLCache(maxsize=settings.RESPONSE_CACHE_MAX_SIZE, ttl=settings.RESPONSE_CACHE_TTL_SECONDS)
+metrics.register("search_cache", search_cache.stats)
+metrics.register("details_cache", details_cache.stats)
+
+# Flight details and seat maps requested by many passengers at once (an
+# announcement, check-in opening) are computed once per flight version
+hot_reads = SingleFlight()
+metrics.register("hot_reads", hot_reads.stats)
+
+
+def _duration_minutes(flight) -> int:
+    return round((flight.scheduled_arrival - flight.scheduled_departure).total_seconds() / 60)
+
+
+def _search_result(flight, origin_code: str, destination_code: str, seats_available: int) -> dict:
+    result = {field: getattr(flight, field) for field in FlightRecord._fields}
+    result.update(
+        origin_code=origin_code,
+        destination_code=destination_code,
+        duration_minutes=_duration_minutes(flight),
+        seats_available=seats_available,
+    )
+    return result
+
+
+def _search_index(db: Session, flights: List[FlightRecord], sort: FlightSearchSort, page: PageParams) -> Page:
+    def seats_of(records) -> dict:
+        # Counters change with every booking, so they are read fresh, in one query
+        ids = [record.id for record in records]
+        return dict(db.query(Flight.id, Flight.seats_available).filter(Flight.id.in_(ids))) if ids else {}
+
+    columns = SEARCH_ORDERS[sort]
+    seats = {}
+    if sort == FlightSearchSort.DEPARTURE:
+        # Index buckets are already in departure order
+        found = paginate_list(flights, lambda f: (f.scheduled_departure, f.id), columns, page)
+    elif sort == FlightSearchSort.DURATION:
+        found = paginate_top(flights, lambda f: (_duration_minutes(f), f.scheduled_departure, f.id), columns, page)
+    else:
+        seats = seats_of(flights)
+        found = paginate_top(flights, lambda f: (seats.get(f.id, 0), f.id), columns, page, descending=True)
+    if sort != FlightSearchSort.SEATS_LEFT:
+        seats = seats_of(found.items)
+
+    code = flight_search_index.airport_code
+    return Page([
+        _search_result(f, code(f.origin_id), code(f.destination_id), seats.get(f.id, 0)) for f in found.items
+    ], found.next_cursor)
+
+
+def _search_cache_key(search_params: FlightSearch, page: PageParams) -> Optional[tuple]:
+    """Cache key of a search between two known airports; other searches are not cached"""
+    if not (search_params.origin and search_params.destination):
+        return None
+    route = (airport_index.airport_id(search_params.origin), airport_index.airport_id(search_params.destination))
+    if None in route:
+        return None
+    day = search_params.date.date() if search_params.date else None
+    return (*route, day, search_params.sort, page.cursor, page.limit, resource_versions.current(("route", *route)))
 
 
 def search_flights(
     db: Session,
-    search_params: FlightSearch
-) -> list:
-    query = db.query(Flight)
+    search_params: FlightSearch,
+    page: PageParams
+) -> Page:
+    """One page of matching flights with airport codes, duration and seats left"""
+    key = _search_cache_key(search_params, page)
+    if key is not None:
+        cached = search_cache.get(key)
+        if cached is not None:
+            return cached
+    found = _search_flights(db, search_params, page)
+    if key is not None:
+        search_cache.set(key, found)
+    return found
+
+
+def _search_flights(db: Session, search_params: FlightSearch, page: PageParams) -> Page:
+    sort = search_params.sort
+    flights = flight_search_index.search(search_params.origin, search_params.destination, search_params.date)
+    if flights is not None:
+        return _search_index(db, flights, sort, page)
+
+    # Codes come from the joined airports, seats left from the flight's counters
+    query = db.query(Flight).options(
+        joinedload(Flight.origin_airport),
+        joinedload(Flight.destination_airport)
+    )
     
     if search_params.origin:
         origin_airport = db.query(Airport).filter(
@@ -37,38 +157,165 @@ def search_flights(
             Flight.scheduled_departure < end_date
         )
     
-    return query.all()
+    found = paginate(query, SEARCH_ORDERS[sort], page, descending=sort == FlightSearchSort.SEATS_LEFT)
+    return Page([
+        _search_result(f, f.origin_airport.code, f.destination_airport.code, f.seats_available)
+        for f in found.items
+    ], found.next_cursor)
 
 
 def get_flight_details(db: Session, flight_id: int) -> dict:
-    flight = db.query(Flight).filter(Flight.id == flight_id).first()
+    """Flight with its airports, airplane and seat counts"""
+    key = (flight_id, resource_versions.current(("flight", flight_id)))
+    cached = details_cache.get(key)
+    if cached is not None:
+        return cached
+    flight = db.query(Flight).options(
+        joinedload(Flight.origin_airport),
+        joinedload(Flight.destination_airport),
+        joinedload(Flight.airplane)
+    ).filter(Flight.id == flight_id).first()
     if not flight:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Flight not found"
         )
     
-    # Get booked seats
-    booked_seats = set()
-    for ticket in db.query(Ticket).join(Booking).filter(
-        Booking.flight_id == flight_id,
-        Booking.status != BookingStatus.CANCELLED
-    ).all():
-        booked_seats.add(ticket.seat_number)
+    details = {
+        "id": flight.id,
+        "flight_number": flight.flight_number,
+        "origin_id": flight.origin_id,
+        "destination_id": flight.destination_id,
+        "airplane_id": flight.airplane_id,
+        "scheduled_departure": flight.scheduled_departure,
+        "scheduled_arrival": flight.scheduled_arrival,
+        "gate": flight.gate,
+        "terminal": flight.terminal,
+        "status": flight.status,
+        "created_at": flight.created_at,
+        "origin_airport": {
+            "id": flight.origin_airport.id,
+            "code": flight.origin_airport.code,
+            "name": flight.origin_airport.name,
+            "city": flight.origin_airport.city,
+            "country": flight.origin_airport.country
+        },
+        "destination_airport": {
+            "id": flight.destination_airport.id,
+            "code": flight.destination_airport.code,
+            "name": flight.destination_airport.name,
+            "city": flight.destination_airport.city,
+            "country": flight.destination_airport.country
+        },
+        "airplane": {
+            "id": flight.airplane.id,
+            "model": flight.airplane.model,
+            "registration_number": flight.airplane.registration_number,
+            "total_seats": flight.airplane.total_seats
+        },
+        "available_seats": flight.seats_available,
+        # Sellable seats, the capacity the counters start from
+        "total_seats": seat_template_for(flight.airplane).bookable_count,
+        "held_seats": flight.seats_held,
+        "booked_seats": flight.seats_booked
+    }
+    details_cache.set(key, details)
+    return details
+
+
+# Accept header media types that select a compact seat map
+SEAT_MAP_MEDIA_TYPES = {
+    "application/vnd.airline.seat-map.bitmap+json": SeatMapFormat.BITMAP,
+    "application/vnd.airline.seat-map.rle+json": SeatMapFormat.RLE,
+}
+
+
+def negotiate_seat_map_format(requested: Optional[SeatMapFormat], accept: Optional[str]) -> SeatMapFormat:
+    """The `format` query parameter wins; otherwise a compact media type in Accept; otherwise full"""
+    if requested is not None:
+        return requested
+    for media_type in (accept or "").split(","):
+        seat_map_format = SEAT_MAP_MEDIA_TYPES.get(media_type.split(";")[0].strip().lower())
+        if seat_map_format is not None:
+            return seat_map_format
+    return SeatMapFormat.FULL
+
+
+def encode_availability(available: int, positions: int, seat_map_format: SeatMapFormat):
+    """Free seat positions of a seat map in a compact format
+
+    BITMAP: base64 of the little-endian bitmap, bit i set when position i is free.
+    RLE: lengths of alternating runs of free and taken positions, starting
+    with a (possibly empty) free run.
+    """
+    if seat_map_format == SeatMapFormat.BITMAP:
+        return base64.b64encode(available.to_bytes((positions + 7) // 8, "little")).decode()
+    bits = format(available, f"0{positions}b")[::-1] if positions else ""
+    runs = [len(list(run)) for _, run in groupby(bits)]
+    return [0] + runs if bits.startswith("0") else runs
+
+
+def get_seat_map(db: Session, flight_id: int, seat_map_format: SeatMapFormat = SeatMapFormat.FULL) -> dict:
+    flight = db.query(Flight).options(
+        joinedload(Flight.airplane),
+        joinedload(Flight.seat_inventory)
+    ).filter(Flight.id == flight_id).first()
+    if not flight:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Flight not found"
+        )
     
-    # Get available seats
-    total_seats = flight.airplane.total_seats
-    available_seats = total_seats - len(booked_seats)
+    # Overlay this flight's free seats on the airplane's cached seat skeleton
+    template = seat_template_for(flight.airplane)
+    inventory = get_inventory(db, flight)
+    available = template.bookable_mask & ~int.from_bytes(inventory.bitmap, "little")
+
+    if seat_map_format != SeatMapFormat.FULL:
+        # Positions follow the airplane's seat template (row-major over rows x seats_per_row)
+        return {
+            "format": seat_map_format.value,
+            "airplane_id": flight.airplane.id,
+            "seat_template": flight.airplane.seat_template,
+            "positions": template.slot_count,
+            "availability": encode_availability(available, template.slot_count, seat_map_format),
+            "total_seats": flight.airplane.total_seats,
+            "available_seats": available.bit_count()
+        }
+
+    seat_map = [
+        [{"seat": code, "available": bool(available >> index & 1)} for code, index in row]
+        for row in template.skeleton
+    ]
     
     return {
-        "flight": flight,
-        "available_seats": available_seats,
-        "total_seats": total_seats,
-        "booked_seats": list(booked_seats)
+        "seat_map": seat_map,
+        "layout": template.layout,
+        "aisles": list(template.aisles),
+        "cabins": template.cabins(),
+        "exit_rows": sorted(template.exit_rows),
+        "total_seats": flight.airplane.total_seats,
+        "available_seats": available.bit_count()
     }
 
 
-def get_seat_map(db: Session, flight_id: int) -> dict:
+def create_flight(db: Session, flight_data: FlightCreate) -> Flight:
+    flight = Flight(**flight_data.dict())
+    db.add(flight)
+    db.flush()
+    rebuild_inventory(db, flight)
+    reset_seat_counters(db, [flight.id])
+    db.commit()
+    db.refresh(flight)
+    flight_search_index.upsert(db, flight)
+    connection_graph.upsert(db, flight)
+    # Searches answered from the index before the upsert may have cached the old route
+    touch(None, ("route", flight.origin_id, flight.destination_id))
+    return flight
+
+
+@retry_on_conflict
+def update_flight(db: Session, flight_id: int, flight_data: FlightUpdate) -> Flight:
     flight = db.query(Flight).filter(Flight.id == flight_id).first()
     if not flight:
         raise HTTPException(
@@ -76,38 +323,52 @@ def get_seat_map(db: Session, flight_id: int) -> dict:
             detail="Flight not found"
         )
     
-    # Get booked seats
-    booked_seats = set()
-    for ticket in db.query(Ticket).join(Booking).filter(
-        Booking.flight_id == flight_id,
-        Booking.status != BookingStatus.CANCELLED
-    ).all():
-        booked_seats.add(ticket.seat_number)
+    old_route = ("route", flight.origin_id, flight.destination_id)
+    update_data = flight_data.dict(exclude_unset=True)
+    for key, value in update_data.items():
+        setattr(flight, key, value)
     
-    seat_template = flight.airplane.seat_template
-    rows = seat_template.get("rows", 30)
-    seats_per_row = seat_template.get("seats_per_row", 6)
-    layout = seat_template.get("layout", "3-3")
+    # A different aircraft means a different seat template
+    if "airplane_id" in update_data:
+        db.flush()
+        db.expire(flight, ["airplane"])
+        rebuild_inventory(db, flight)
+        reset_seat_counters(db, [flight.id])
     
-    # Generate seat map
-    seat_map = []
-    seat_letters = "ABCDEFGH"
-    
-    for row in range(1, rows + 1):
-        row_seats = []
-        for col in range(seats_per_row):
-            seat_letter = seat_letters[col]
-            seat_number = f"{row}{seat_letter}"
-            row_seats.append({
-                "seat": seat_number,
-                "available": seat_number not in booked_seats
-            })
-        seat_map.append(row_seats)
-    
-    return {
-        "seat_map": seat_map,
-        "layout": layout,
-        "total_seats": flight.airplane.total_seats,
-        "available_seats": flight.airplane.total_seats - len(booked_seats)
-    }
+    db.commit()
+    db.refresh(flight)
+    flight_search_index.upsert(db, flight)
+    connection_graph.upsert(db, flight)
+    # Searches answered from the index before the upsert may have cached the old flight
+    touch(None, old_route, ("route", flight.origin_id, flight.destination_id))
+    return flight
+
+
+async def search_flights_async(db: AsyncSession, search_params: FlightSearch, page: PageParams) -> Page:
+    return await db.run_sync(search_flights, search_params, page)
+
+
+async def _coalesced(db: AsyncSession, fn, flight_id: int, *args):
+    """`fn(db, flight_id, *args)`, shared by concurrent identical calls"""
+    if not settings.REQUEST_COALESCING:
+        return await db.run_sync(fn, flight_id, *args)
+    # The version keeps callers arriving after a write from sharing an older read
+    key = (fn.__name__, flight_id, *args, resource_versions.current(("flight", flight_id)))
+    return await hot_reads.run(key, lambda: db.run_sync(fn, flight_id, *args))
+
+
+async def get_flight_details_async(db: AsyncSession, flight_id: int) -> dict:
+    return await _coalesced(db, get_flight_details, flight_id)
+
+
+async def get_seat_map_async(db: AsyncSession, flight_id: int,
+                             seat_map_format: SeatMapFormat = SeatMapFormat.FULL) -> dict:
+    return await _coalesced(db, get_seat_map, flight_id, seat_map_format)
+
+
+async def create_flight_async(db: AsyncSession, flight_data: FlightCreate) -> Flight:
+    return await db.run_sync(create_flight, flight_data)
+
 
+async def update_flight_async(db: AsyncSession, flight_id: int, flight_data: FlightUpdate) -> Flight:
+    return await db.run_sync(update_flight, flight_id, flight_data)
@@ -0,0 +1,155 @@
+"""
+Release of expired seat holds.
+
+A booking holds its seats for 10 minutes while it is CREATED. A background
+sweeper started in the app lifespan cancels expired holds across all flights
+on a fixed interval and frees their seats in the seat inventory, so seat maps
+and availability stay accurate without any booking paying for the cleanup.
+Each batch is one UPDATE ... RETURNING, driven by the (status, expiry) index.
+"""
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session, joinedload
+from app.core import metrics
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.booking import Booking, BookingStatus
+from app.models.flight import Flight
+from app.models.ticket import Ticket
+from app.services.change_events import record_change
+from app.services.resource_versions import touch
+from app.services.seat_counters import adjust_seat_counters
+from app.services.seat_inventory import release_seats, retry_on_conflict
+
+logger = logging.getLogger(__name__)
+
+
+def release_expired_holds(db: Session, limit: int, flight_id: Optional[int] = None) -> int:
+    """Cancel up to `limit` expired holds (optionally of one flight) and free their seats; does not commit"""
+    expired = select(Booking.id).where(
+        Booking.status == BookingStatus.CREATED,
+        Booking.seat_hold_expires_at < datetime.utcnow()
+    )
+    if flight_id is not None:
+        expired = expired.where(Booking.flight_id == flight_id)
+
+    # Only rows this statement actually cancelled are returned, so a booking
+    # paid for in the meantime keeps its seats
+    cancelled = db.execute(
+        update(Booking)
+        .where(Booking.id.in_(expired.limit(limit).scalar_subquery()))
+        .values(status=BookingStatus.CANCELLED)
+        .returning(Booking.id, Booking.flight_id, Booking.user_id),
+        execution_options={"synchronize_session": False}
+    ).all()
+    if not cancelled:
+        return 0
+
+    flight_of = {booking_id: flight_id for booking_id, flight_id, _ in cancelled}
+    touch(db, *{("trips", user_id) for _, _, user_id in cancelled})
+    for booking_id, booking_flight_id, user_id in cancelled:
+        record_change(db, Booking, booking_id,
+                      {"status": (BookingStatus.CREATED, BookingStatus.CANCELLED)},
+                      {"id": booking_id, "flight_id": booking_flight_id, "user_id": user_id,
+                       "status": BookingStatus.CANCELLED})
+    seats_by_flight = defaultdict(list)
+    for booking_id, seat_number in db.query(Ticket.booking_id, Ticket.seat_number).filter(
+        Ticket.booking_id.in_(flight_of)
+    ):
+        seats_by_flight[flight_of[booking_id]].append(seat_number)
+
+    flights = db.query(Flight).options(
+        joinedload(Flight.airplane), joinedload(Flight.seat_inventory)
+    ).filter(Flight.id.in_(seats_by_flight))
+    for flight in flights:
+        release_seats(db, flight, seats_by_flight[flight.id])
+        adjust_seat_counters(db, flight.id, held=-len(seats_by_flight[flight.id]))
+    return len(cancelled)
+
+
+@retry_on_conflict
+def _release_batch(db: Session, batch_size: int) -> int:
+    count = release_expired_holds(db, batch_size)
+    db.commit()
+    return count
+
+
+def sweep_expired_holds(db: Session, batch_size: int) -> int:
+    """Release every expired hold, committing after each batch"""
+    released = 0
+    while True:
+        count = _release_batch(db, batch_size)
+        released += count
+        if count < batch_size:
+            return released
+
+
+class HoldSweeper:
+    def __init__(self, interval: float, batch_size: int):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+        self.sweeps = 0
+        self.released_total = 0
+        self.last_released = 0
+        self.last_duration_ms = 0.0
+        self.last_run_at: Optional[datetime] = None
+        self.errors = 0
+
+    async def sweep(self) -> int:
+        started = time.perf_counter()
+        async with AsyncSessionLocal() as db:
+            released = await db.run_sync(sweep_expired_holds, self.batch_size)
+        self.sweeps += 1
+        self.released_total += released
+        self.last_released = released
+        self.last_duration_ms = round((time.perf_counter() - started) * 1000, 2)
+        self.last_run_at = datetime.utcnow()
+        return released
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.sweep()
+            except Exception:
+                # Keep sweeping; a locked database or similar is usually transient
+                self.errors += 1
+                logger.exception("Seat hold sweep failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "interval_seconds": self.interval,
+            "sweeps": self.sweeps,
+            "released_total": self.released_total,
+            "last_released": self.last_released,
+            "last_duration_ms": self.last_duration_ms,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            "errors": self.errors,
+        }
+
+
+hold_sweeper = HoldSweeper(
+    interval=settings.HOLD_SWEEP_INTERVAL_SECONDS,
+    batch_size=settings.HOLD_SWEEP_BATCH_SIZE,
+)
+metrics.register("hold_sweeper", hold_sweeper.stats)
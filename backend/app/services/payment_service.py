@@ -1,10 +1,17 @@
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
+from datetime import datetime
 from app.models.payment import Payment, PaymentStatus, PaymentMethod
 from app.models.booking import Booking, BookingStatus
 from app.models.ticket import Ticket
+from app.services.change_events import record_change
+from app.services.resource_versions import touch
+from app.services.seat_counters import adjust_seat_counters
+from app.services.seat_inventory import retry_on_conflict
 
 
+@retry_on_conflict
 def process_payment(
     db: Session,
     booking_id: int,
@@ -31,6 +38,12 @@ def process_payment(
             detail="Cannot process payment for cancelled booking"
         )
     
+    if booking.status == BookingStatus.CREATED and booking.seat_hold_expires_at < datetime.utcnow():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Seat hold has expired, please book again"
+        )
+    
     # Check if payment already exists
     existing = db.query(Payment).filter(Payment.booking_id == booking_id).first()
     if existing:
@@ -42,6 +55,7 @@ def process_payment(
         # Update existing payment
         existing.status = PaymentStatus.PAID
         existing.transaction_id = transaction_id
+        touch(db, ("trips", booking.user_id))
         db.commit()
         db.refresh(existing)
         return existing
@@ -50,6 +64,22 @@ def process_payment(
     ticket_count = db.query(Ticket).filter(Ticket.booking_id == booking_id).count()
     amount = ticket_count * 100.0
     
+    # Update booking status; conditional, so a hold released or paid for
+    # concurrently is not confirmed (and counted) twice
+    confirmed = db.query(Booking).filter(
+        Booking.id == booking_id,
+        Booking.status == BookingStatus.CREATED
+    ).update({Booking.status: BookingStatus.CONFIRMED}, synchronize_session=False)
+    if not confirmed:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Booking is no longer awaiting payment"
+        )
+    adjust_seat_counters(db, booking.flight_id, held=-ticket_count, booked=ticket_count)
+    record_change(db, Booking, booking_id, {"status": (BookingStatus.CREATED, BookingStatus.CONFIRMED)},
+                  {"id": booking_id, "flight_id": booking.flight_id, "user_id": booking.user_id,
+                   "status": BookingStatus.CONFIRMED})
+    
     # Create payment (mock: always succeeds)
     payment = Payment(
         booking_id=booking_id,
@@ -59,11 +89,15 @@ def process_payment(
         transaction_id=transaction_id
     )
     db.add(payment)
-    
-    # Update booking status
-    booking.status = BookingStatus.CONFIRMED
-    
+    touch(db, ("trips", booking.user_id))
     db.commit()
     db.refresh(payment)
     return payment
 
+
+async def process_payment_async(
+    db: AsyncSession,
+    booking_id: int,
+    transaction_id: str
+) -> Payment:
+    return await db.run_sync(process_payment, booking_id, transaction_id)
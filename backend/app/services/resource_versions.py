@@ -0,0 +1,88 @@
+"""
+Versions of cacheable resources, for ETags and the response cache.
+
+Each resource key has a version that moves whenever a write could change how
+the resource renders:
+
+    ("flight", id)      the flight row, its seat counters or its seat map
+    ("route", o, d)     any flight between two airport ids, or its seat counters
+    "flights"           any flight (trip lists and announcements show flight times)
+    ("trips", user_id)  a user's bookings, their tickets and payments
+    "announcements"     any announcement
+    ("inbox", user_id)  a user's announcement inbox and its read state
+
+Flight writes arrive as committed change events (see `change_events`),
+announcement writes through a mapper event and routes through the calendar's
+route invalidation; booking changes made with bulk UPDATEs call `touch` in the
+services. Versions only move once the writing transaction commits, so a
+version is never newer than the data a request reads after it.
+
+Versions are per process, like the flight search index: writes made by
+another process do not move them. Set CONDITIONAL_REQUESTS=false when several
+processes serve writes.
+"""
+import itertools
+import threading
+from typing import Dict, Hashable, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from app.core import metrics
+from app.core.commit_hooks import on_commit, pending
+from app.models.announcement import Announcement
+from app.models.flight import Flight
+from app.services.change_events import ChangeEvent, change_bus
+
+
+class ResourceVersions:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # One process-wide clock, so a key never returns to an earlier version
+        self._clock = itertools.count(1)
+        self._versions: Dict[Hashable, int] = {}
+        self.bumps = 0
+
+    def current(self, *keys: Hashable) -> Tuple[int, ...]:
+        return tuple(self._versions.get(key, 0) for key in keys)
+
+    def bump(self, keys) -> None:
+        with self._lock:
+            version = next(self._clock)
+            for key in keys:
+                self._versions[key] = version
+                self.bumps += 1
+
+    def stats(self) -> dict:
+        return {"resources": len(self._versions), "bumps": self.bumps}
+
+
+resource_versions = ResourceVersions()
+metrics.register("resource_versions", resource_versions.stats)
+
+
+def touch(db: Optional[Session], *keys: Hashable) -> None:
+    """Move the versions of `keys` once `db` commits (immediately without a session)"""
+    if db is None:
+        resource_versions.bump(keys)
+    else:
+        pending(db, "changed_resources", set).update(keys)
+
+
+def _bump_changed_flight(change: ChangeEvent) -> None:
+    resource_versions.bump((("flight", change.entity_id), "flights"))
+
+
+change_bus.subscribe(Flight, _bump_changed_flight)
+
+
+@event.listens_for(Announcement, "after_insert")
+@event.listens_for(Announcement, "after_update")
+@event.listens_for(Announcement, "after_delete")
+def _touch_changed_announcement(mapper, connection, target):
+    touch(object_session(target), "announcements")
+
+
+@on_commit("changed_resources")
+def _bump_committed_resources(keys):
+    if keys:
+        resource_versions.bump(keys)
@@ -0,0 +1,151 @@
+"""
+Denormalized seat counters on flights.
+
+Every flight carries how many of its tickets are held (CREATED bookings), how
+many are booked (CONFIRMED bookings) and how many bookable seats are left, so
+availability is a column read instead of a count over tickets. The services
+move the counters with relative UPDATEs (`seats_held = seats_held + 1`) in the
+same transaction as the booking change:
+
+    create booking        held += n
+    payment confirmed     held -= n, booked += n
+    cancellation          held -= n or booked -= n, whichever the booking was
+    hold expiry           held -= n
+    seat reassignment     no change
+
+`reset_seat_counters` recomputes them from tickets; `verify_seat_counters`
+reports (and optionally repairs) flights whose counters have drifted.
+"""
+from collections import defaultdict
+from typing import Iterable, List, Optional, Union
+
+from sqlalchemy import case, func, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from app.models.airplane import Airplane
+from app.models.booking import Booking, BookingStatus
+from app.models.flight import Flight
+from app.models.ticket import Ticket
+from app.services.flight_calendar import calendar_cache, invalidate_route
+from app.services.resource_versions import touch
+from app.services.seat_template import compile_seat_template
+
+
+def adjust_seat_counters(db: Session, flight_id: int, held: int = 0, booked: int = 0) -> None:
+    """Move a flight's counters by the given ticket deltas; does not commit"""
+    route = db.execute(
+        update(Flight)
+        .where(Flight.id == flight_id)
+        .values(
+            seats_held=Flight.seats_held + held,
+            seats_booked=Flight.seats_booked + booked,
+            seats_available=Flight.seats_available - held - booked,
+        )
+        .returning(Flight.origin_id, Flight.destination_id),
+        execution_options={"synchronize_session": False}
+    ).first()
+    if route is not None:
+        invalidate_route(db, *route)
+        touch(db, ("flight", flight_id))
+
+
+def _ticket_counts():
+    """(flight id, held, booked) for every flight with live tickets"""
+    return select(
+        Booking.flight_id,
+        func.sum(case((Booking.status == BookingStatus.CREATED, 1), else_=0)).label("held"),
+        func.sum(case((Booking.status == BookingStatus.CONFIRMED, 1), else_=0)).label("booked"),
+    ).join(Ticket, Ticket.booking_id == Booking.id).where(
+        Booking.status != BookingStatus.CANCELLED
+    ).group_by(Booking.flight_id)
+
+
+def _capacities(db: Union[Session, Connection], airplane_ids: Optional[Iterable[int]] = None) -> dict:
+    query = select(Airplane.id, Airplane.seat_template)
+    if airplane_ids is not None:
+        query = query.where(Airplane.id.in_(list(airplane_ids)))
+    return {
+        airplane_id: compile_seat_template(seat_template).bookable_count
+        for airplane_id, seat_template in db.execute(query)
+    }
+
+
+def reset_seat_counters(db: Union[Session, Connection], flight_ids: Optional[List[int]] = None) -> None:
+    """Recompute the counters of the given flights (all if None) from their tickets; does not commit
+
+    The first UPDATE takes SQLite's write lock, so the counts cannot change
+    between reading tickets and writing the counters.
+    """
+    def only(statement, id_column):
+        return statement if flight_ids is None else statement.where(id_column.in_(flight_ids))
+
+    counts = only(_ticket_counts(), Booking.flight_id).subquery()
+    options = {"synchronize_session": False}
+    db.execute(only(update(Flight), Flight.id).values(seats_held=0, seats_booked=0),
+               execution_options=options)
+    db.execute(
+        update(Flight)
+        .where(Flight.id == counts.c.flight_id)
+        .values(seats_held=counts.c.held, seats_booked=counts.c.booked),
+        execution_options=options
+    )
+
+    airplane_ids = None
+    if flight_ids is not None:
+        airplane_ids = db.execute(
+            select(Flight.airplane_id).where(Flight.id.in_(flight_ids)).distinct()
+        ).scalars().all()
+    # Few distinct capacities, so one UPDATE per capacity rather than per airplane
+    airplanes_by_capacity = defaultdict(list)
+    for airplane_id, capacity in _capacities(db, airplane_ids).items():
+        airplanes_by_capacity[capacity].append(airplane_id)
+    for capacity, ids in airplanes_by_capacity.items():
+        db.execute(
+            only(update(Flight), Flight.id)
+            .where(Flight.airplane_id.in_(ids))
+            .values(seats_available=capacity - Flight.seats_held - Flight.seats_booked),
+            execution_options=options
+        )
+
+
+def verify_seat_counters(db: Session, repair: bool = False, batch_size: int = 10_000) -> List[dict]:
+    """Compare every flight's counters with its tickets, in flight id batches
+
+    Returns one entry per drifted flight with the expected and stored values.
+    With `repair`, drifted flights are recomputed and committed batch by batch.
+    """
+    capacities = _capacities(db)
+    drifted = []
+    last_id = 0
+    while True:
+        flights = db.execute(
+            select(Flight.id, Flight.airplane_id, Flight.seats_held, Flight.seats_booked, Flight.seats_available)
+            .where(Flight.id > last_id).order_by(Flight.id).limit(batch_size)
+        ).all()
+        if not flights:
+            return drifted
+        first_id, last_id = flights[0].id, flights[-1].id
+        counts = {
+            flight_id: (held, booked)
+            for flight_id, held, booked in db.execute(
+                _ticket_counts().where(Booking.flight_id.between(first_id, last_id))
+            )
+        }
+
+        batch = []
+        for flight in flights:
+            held, booked = counts.get(flight.id, (0, 0))
+            expected = (held, booked, capacities[flight.airplane_id] - held - booked)
+            stored = (flight.seats_held, flight.seats_booked, flight.seats_available)
+            if expected != stored:
+                batch.append({
+                    "flight_id": flight.id,
+                    "expected": dict(zip(("held", "booked", "available"), expected)),
+                    "stored": dict(zip(("held", "booked", "available"), stored)),
+                })
+        drifted.extend(batch)
+        if repair and batch:
+            reset_seat_counters(db, [entry["flight_id"] for entry in batch])
+            touch(db, *(("flight", entry["flight_id"]) for entry in batch))
+            db.commit()
+            calendar_cache.clear()
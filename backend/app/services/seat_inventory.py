@@ -0,0 +1,171 @@
+import functools
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+from fastapi import HTTPException, status
+from typing import Callable, Iterable, List, Optional
+from app.core import metrics
+from app.core.config import settings
+from app.models.flight import Flight
+from app.models.ticket import Ticket
+from app.models.booking import Booking, BookingStatus
+from app.models.seat_inventory import SeatInventory
+from app.services.seat_template import seat_template_for
+
+conflict_stats = {"conflicts": 0, "gave_up": 0}
+metrics.register("seat_inventory", lambda: dict(conflict_stats))
+
+# Unique keys two concurrent units of work can both claim; a re-run sees the winner's row
+CONFLICT_KEYS = ("seat_inventories.flight_id", "bookings.pnr", "payments.transaction_id")
+
+
+def _is_conflict(exc: Exception) -> bool:
+    if isinstance(exc, StaleDataError):
+        return True
+    if isinstance(exc, OperationalError):
+        return "locked" in str(exc.orig)
+    # SQLite reports e.g. "UNIQUE constraint failed: bookings.pnr"
+    message = str(exc.orig)
+    return message.startswith("UNIQUE constraint failed") and any(key in message for key in CONFLICT_KEYS)
+
+
+def retry_on_conflict(fn: Callable) -> Callable:
+    """Re-run a whole unit of work when a concurrent request changed the same seat inventory
+
+    Inventory rows carry a version number, so writing one that changed since it
+    was read raises StaleDataError instead of overwriting the other request's
+    seats. Two requests creating a flight's missing inventory row (or drawing
+    the same PNR, or paying with the same transaction id) collide on one of
+    CONFLICT_KEYS instead, and SQLite reports a write-write deadlock as
+    "database is locked". Any other error, including other constraint
+    violations, is raised as is. The wrapped function must start from scratch
+    and commit at its end.
+    """
+    @functools.wraps(fn)
+    def wrapper(db: Session, *args, **kwargs):
+        for _ in range(settings.INVENTORY_CONFLICT_RETRIES + 1):
+            try:
+                return fn(db, *args, **kwargs)
+            except (StaleDataError, IntegrityError, OperationalError) as exc:
+                if not _is_conflict(exc):
+                    raise
+                db.rollback()
+                conflict_stats["conflicts"] += 1
+        conflict_stats["gave_up"] += 1
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Seats on this flight are changing, please retry"
+        )
+    return wrapper
+
+
+def is_occupied(inventory: SeatInventory, index: int) -> bool:
+    return bool(inventory.bitmap[index >> 3] & (1 << (index & 7)))
+
+
+def occupied_count(inventory: SeatInventory) -> int:
+    return int.from_bytes(inventory.bitmap, "little").bit_count()
+
+
+def occupied_seat_numbers(flight: Flight, inventory: SeatInventory) -> List[str]:
+    codes = seat_template_for(flight.airplane).codes
+    return [
+        codes[index]
+        for index in range(inventory.seat_count)
+        if is_occupied(inventory, index) and codes[index] is not None
+    ]
+
+
+def _build_inventory(db: Session, flight: Flight, inventory: Optional[SeatInventory] = None) -> SeatInventory:
+    template = seat_template_for(flight.airplane)
+    seat_count = template.slot_count
+    bitmap = bytearray((seat_count + 7) // 8)
+
+    # Only the seat column is needed, so skip hydrating Ticket objects
+    seats = db.query(Ticket.seat_number).join(Booking).filter(
+        Booking.flight_id == flight.id,
+        Booking.status != BookingStatus.CANCELLED
+    ).all()
+    for (seat_number,) in seats:
+        index = template.seat_index(seat_number)
+        if index is not None:
+            bitmap[index >> 3] |= 1 << (index & 7)
+
+    if inventory is None:
+        inventory = SeatInventory(flight_id=flight.id)
+    inventory.seat_count = seat_count
+    inventory.bitmap = bytes(bitmap)
+    return inventory
+
+
+def get_inventory(db: Session, flight: Flight) -> SeatInventory:
+    """Seat inventory for reading; built on the fly (not persisted) if the flight has none yet"""
+    inventory = flight.seat_inventory
+    if inventory is None or inventory.seat_count != seat_template_for(flight.airplane).slot_count:
+        return _build_inventory(db, flight)
+    return inventory
+
+
+def rebuild_inventory(db: Session, flight: Flight) -> SeatInventory:
+    """Recompute a flight's seat bitmap from its tickets and stage it in the session"""
+    inventory = _build_inventory(db, flight, flight.seat_inventory)
+    if flight.seat_inventory is None:
+        db.add(inventory)
+        flight.seat_inventory = inventory
+    return inventory
+
+
+def _inventory_for_update(db: Session, flight: Flight) -> SeatInventory:
+    inventory = flight.seat_inventory
+    if inventory is None or inventory.seat_count != seat_template_for(flight.airplane).slot_count:
+        inventory = rebuild_inventory(db, flight)
+    return inventory
+
+
+def reserve_seats(db: Session, flight: Flight, seat_numbers: Iterable[str]) -> None:
+    """Mark seats as taken; raises if a seat does not exist or is already taken"""
+    template = seat_template_for(flight.airplane)
+    inventory = _inventory_for_update(db, flight)
+    bitmap = bytearray(inventory.bitmap)
+    for seat_number in seat_numbers:
+        index = template.seat_index(seat_number)
+        if index is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Seat {seat_number} does not exist on this aircraft"
+            )
+        if not template.bookable_mask >> index & 1:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Seat {seat_number} is not available for booking"
+            )
+        if bitmap[index >> 3] & (1 << (index & 7)):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Seat {seat_number} is already booked"
+            )
+        bitmap[index >> 3] |= 1 << (index & 7)
+    inventory.bitmap = bytes(bitmap)
+
+
+def release_seats(db: Session, flight: Flight, seat_numbers: Iterable[str]) -> None:
+    """Mark seats as free again"""
+    template = seat_template_for(flight.airplane)
+    inventory = _inventory_for_update(db, flight)
+    bitmap = bytearray(inventory.bitmap)
+    for seat_number in seat_numbers:
+        index = template.seat_index(seat_number)
+        if index is not None:
+            bitmap[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+    inventory.bitmap = bytes(bitmap)
+
+
+def backfill_inventories(db: Session) -> int:
+    """Create inventories for flights that predate the seat inventory table"""
+    flights = db.query(Flight).outerjoin(SeatInventory).filter(
+        SeatInventory.flight_id.is_(None)
+    ).all()
+    for flight in flights:
+        rebuild_inventory(db, flight)
+    db.commit()
+    return len(flights)
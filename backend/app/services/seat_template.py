@@ -0,0 +1,219 @@
+"""
+Compiled seat templates.
+
+An airplane's `seat_template` JSON describes its cabin:
+
+    {
+        "rows": 42, "seats_per_row": 9, "layout": "3-3-3",
+        "letters": "ABCDEFGHK",                     # optional, defaults to SEAT_LETTERS
+        "cabins": [{"class": "business", "from_row": 1, "to_row": 6}],  # rest is economy
+        "exit_rows": [14, 30],
+        "missing": ["1B", "1E"],                    # grid positions without a seat
+        "blocked": ["14B"]                          # seats that are never sold
+    }
+
+It is compiled once per airplane into an immutable SeatTemplate holding every
+seat code, its position in the seat inventory bitmap, the aisle positions and
+per-row cabin and exit-row flags. Seat maps only overlay a flight's
+availability on that skeleton. Bitmap positions are row-major over the full
+rows x seats_per_row grid, so missing seats leave gaps instead of shifting
+the seats after them.
+
+Compiled templates are cached by airplane id and dropped when the airplane is
+updated or deleted.
+"""
+from types import MappingProxyType
+from typing import Dict, FrozenSet, Mapping, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+from app.core import metrics
+from app.core.commit_hooks import on_commit, pending
+from app.models.airplane import Airplane
+
+SEAT_LETTERS = "ABCDEFGHJK"
+DEFAULT_CABIN = "economy"
+
+
+def normalize_seat_number(seat_number: Optional[str]) -> Optional[str]:
+    """Seat code as templates and tickets store it: upper case, no surrounding spaces"""
+    return seat_number.strip().upper() if seat_number else seat_number
+
+
+class SeatTemplate(NamedTuple):
+    rows: int
+    seats_per_row: int
+    layout: str
+    letters: str
+    # Column counts after which an aisle runs, e.g. (3, 6) for "3-3-3"
+    aisles: Tuple[int, ...]
+    # Cabin class of each row, index 0 is row 1
+    row_cabins: Tuple[str, ...]
+    exit_rows: FrozenSet[int]
+    # Seat code at each bitmap position, None where the grid has no seat
+    codes: Tuple[Optional[str], ...]
+    index_of: Mapping[str, int]
+    # Per row, the (code, bitmap position) of each seat, left to right
+    skeleton: Tuple[Tuple[Tuple[str, int], ...], ...]
+    # Bit set for every position that can be sold
+    bookable_mask: int
+    blocked: FrozenSet[str]
+
+    @property
+    def slot_count(self) -> int:
+        """Positions in the seat inventory bitmap"""
+        return len(self.codes)
+
+    @property
+    def seat_count(self) -> int:
+        return len(self.index_of)
+
+    @property
+    def bookable_count(self) -> int:
+        """Seats that can be sold, i.e. the flight capacity"""
+        return self.bookable_mask.bit_count()
+
+    def seat_index(self, seat_number: str) -> Optional[int]:
+        """Position of a seat in the inventory bitmap, or None if the aircraft has no such seat"""
+        if not seat_number:
+            return None
+        return self.index_of.get(normalize_seat_number(seat_number))
+
+    def cabins(self) -> list:
+        """Row ranges per cabin class, in row order"""
+        ranges = []
+        for row, cabin in enumerate(self.row_cabins, start=1):
+            if ranges and ranges[-1]["class"] == cabin:
+                ranges[-1]["to_row"] = row
+            else:
+                ranges.append({"class": cabin, "from_row": row, "to_row": row})
+        return ranges
+
+
+def _seat_codes(seat_template: dict, key: str, index_of: Dict[str, int]) -> FrozenSet[str]:
+    codes = frozenset(str(code).upper() for code in seat_template.get(key, ()))
+    unknown = codes - index_of.keys()
+    if unknown:
+        raise ValueError(f"{key} lists seats outside the grid: {', '.join(sorted(unknown))}")
+    return codes
+
+
+def compile_seat_template(seat_template: dict) -> SeatTemplate:
+    """Compile a seat template JSON; raises ValueError if it is inconsistent"""
+    rows = int(seat_template.get("rows", 30))
+    seats_per_row = int(seat_template.get("seats_per_row", 6))
+    if rows < 1 or seats_per_row < 1:
+        raise ValueError("rows and seats_per_row must be positive")
+    letters = str(seat_template.get("letters", SEAT_LETTERS[:seats_per_row])).upper()
+    if len(letters) != seats_per_row or len(set(letters)) != seats_per_row:
+        raise ValueError("letters must name each seat in a row exactly once")
+
+    layout = str(seat_template.get("layout", str(seats_per_row)))
+    try:
+        groups = [int(size) for size in layout.split("-")]
+    except ValueError:
+        raise ValueError(f"layout {layout!r} is not of the form 3-3")
+    if sum(groups) != seats_per_row or min(groups) < 1:
+        raise ValueError(f"layout {layout} does not add up to {seats_per_row} seats per row")
+    aisles = tuple(sum(groups[:i + 1]) for i in range(len(groups) - 1))
+
+    row_cabins = [DEFAULT_CABIN] * rows
+    for cabin in seat_template.get("cabins", ()):
+        first, last = int(cabin["from_row"]), int(cabin["to_row"])
+        if not 1 <= first <= last <= rows:
+            raise ValueError(f"cabin rows {first}-{last} are outside 1-{rows}")
+        row_cabins[first - 1:last] = [str(cabin["class"])] * (last - first + 1)
+
+    exit_rows = frozenset(int(row) for row in seat_template.get("exit_rows", ()))
+    if any(not 1 <= row <= rows for row in exit_rows):
+        raise ValueError(f"exit rows must be within 1-{rows}")
+
+    grid = {
+        f"{row}{letter}": (row - 1) * seats_per_row + col
+        for row in range(1, rows + 1)
+        for col, letter in enumerate(letters)
+    }
+    missing = _seat_codes(seat_template, "missing", grid)
+    blocked = _seat_codes(seat_template, "blocked", grid) - missing
+    index_of = {code: index for code, index in grid.items() if code not in missing}
+
+    codes = [None] * (rows * seats_per_row)
+    for code, index in index_of.items():
+        codes[index] = code
+    skeleton = tuple(
+        tuple(
+            (codes[index], index)
+            for index in range(row * seats_per_row, (row + 1) * seats_per_row)
+            if codes[index] is not None
+        )
+        for row in range(rows)
+    )
+    bookable_mask = 0
+    for code, index in index_of.items():
+        if code not in blocked:
+            bookable_mask |= 1 << index
+
+    return SeatTemplate(
+        rows=rows,
+        seats_per_row=seats_per_row,
+        layout=layout,
+        letters=letters,
+        aisles=aisles,
+        row_cabins=tuple(row_cabins),
+        exit_rows=exit_rows,
+        codes=tuple(codes),
+        index_of=MappingProxyType(index_of),
+        skeleton=skeleton,
+        bookable_mask=bookable_mask,
+        blocked=blocked,
+    )
+
+
+def validate_seat_template(seat_template: dict) -> SeatTemplate:
+    try:
+        return compile_seat_template(seat_template)
+    except (KeyError, TypeError, ValueError) as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid seat template: {exc}"
+        )
+
+
+# Airplane id -> compiled template
+_compiled: Dict[int, SeatTemplate] = {}
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+metrics.register("seat_templates", lambda: {"cached": len(_compiled), **_stats})
+
+
+def seat_template_for(airplane: Airplane) -> SeatTemplate:
+    """Compiled seat template of an airplane, cached by airplane id"""
+    template = _compiled.get(airplane.id)
+    if template is not None:
+        _stats["hits"] += 1
+        return template
+    _stats["misses"] += 1
+    template = compile_seat_template(airplane.seat_template)
+    if airplane.id is not None:
+        _compiled[airplane.id] = template
+    return template
+
+
+def invalidate_seat_template(airplane_id: int) -> None:
+    if _compiled.pop(airplane_id, None) is not None:
+        _stats["invalidations"] += 1
+
+
+@event.listens_for(Airplane, "after_update")
+@event.listens_for(Airplane, "after_delete")
+def _invalidate_changed_airplane(mapper, connection, target):
+    invalidate_seat_template(target.id)
+    session = object_session(target)
+    if session is not None:
+        pending(session, "changed_airplane_ids", set).add(target.id)
+
+
+@on_commit("changed_airplane_ids")
+def _invalidate_committed_airplanes(airplane_ids):
+    for airplane_id in airplane_ids:
+        invalidate_seat_template(airplane_id)
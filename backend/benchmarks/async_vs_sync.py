@@ -0,0 +1,126 @@
+"""
+Compare request throughput of the sync (threadpool) and async (AsyncSession) data paths.
+
+Both variants serve the same flight search through the same service function;
+the sync one uses a blocking Session in a `def` endpoint, the async one an
+AsyncSession in an `async def` endpoint. Requests are driven in-process
+through httpx's ASGI transport, so the numbers reflect the server side only.
+
+Expect the async path to be slower against a local SQLite file (10-20%
+fewer requests per second in our runs). The async services wrap the sync ORM
+code in `run_sync`, and so does AsyncSession itself, so query building and
+row processing all run on the one event loop thread, and every statement
+also hops to aiosqlite's worker thread. The sync path spreads the same work
+over the 40-slot threadpool. What the async path buys is that a request
+waiting on the database holds no threadpool slot, which only pays off when
+the database is slower than the threadpool can absorb.
+
+Usage (from the backend directory):
+    python benchmarks/async_vs_sync.py --requests 5000 --concurrency 500
+    python benchmarks/async_vs_sync.py --flights 200000   # against a generated dataset
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Point the app at a throwaway database before anything from app/ is imported
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+_db_dir = tempfile.mkdtemp(prefix="airline-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core.database import async_engine, get_db, get_async_db
+from app.core.pagination import PageParams
+from app.schemas.flight import FlightSearch
+from app.services.flight_service import search_flights, search_flights_async
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    params = FlightSearch(origin="JFK", destination="LAX")
+    page = PageParams(cursor=None, limit=50)
+
+    @app.get("/sync/search")
+    def sync_search(db: Session = Depends(get_db)):
+        return len(search_flights(db, params, page).items)
+
+    @app.get("/async/search")
+    async def async_search(db: AsyncSession = Depends(get_async_db)):
+        return len((await search_flights_async(db, params, page)).items)
+
+    return app
+
+
+async def run(app: FastAPI, path: str, total: int, concurrency: int) -> dict:
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(path)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "throughput": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--flights", type=int, default=0,
+                        help="Use a generated dataset of this many flights instead of seed_data.py")
+    args = parser.parse_args()
+
+    if args.flights:
+        from app.core.database import engine
+        from generate_dataset import generate_dataset
+        generate_dataset(engine, flights=args.flights, bookings=args.flights)
+    else:
+        # seed_data creates the tables and works against DATABASE_URL on import
+        import seed_data
+        seed_data.seed_airports()
+        seed_data.seed_airplanes()
+        seed_data.seed_flights()
+
+    app = build_app()
+
+    async def compare():
+        results = {}
+        for mode in ("sync", "async"):
+            result = results[mode] = await run(app, f"/{mode}/search", args.requests, args.concurrency)
+            print(
+                f"{mode:>5}: {result['throughput']:8.0f} req/s  "
+                f"p50 {result['p50_ms']:7.1f} ms  p99 {result['p99_ms']:7.1f} ms"
+            )
+        ratio = results["async"]["throughput"] / results["sync"]["throughput"]
+        print(f"async/sync throughput: {ratio:.2f}x "
+              "(ORM work runs on the event loop thread in async; see the module docstring)")
+        await async_engine.dispose()
+
+    asyncio.run(compare())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Concurrent booking stress test for one flight.
+
+Worker threads fire bookings at a small pool of seats on a single flight,
+each through its own session, and cancel some of their successful bookings
+so the same seats are fought over again. At the end the script checks that
+no seat is held by more than one active ticket and that both the seat
+inventory and the flight's seat counters match the tickets, and reports
+throughput and outcomes.
+
+Usage (from the backend directory):
+    python benchmarks/booking_stress.py --threads 8 --attempts 2000 --seats 24
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+# Point the app at a throwaway database before anything from app/ is imported
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+_db_dir = tempfile.mkdtemp(prefix="airline-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import func
+from app.core.database import SessionLocal
+from app.models.booking import Booking, BookingStatus
+from app.models.flight import Flight
+from app.models.passenger_profile import PassengerProfile
+from app.models.ticket import Ticket
+from app.models.user import User
+from app.services.booking_service import cancel_booking, create_booking
+from app.services.seat_counters import verify_seat_counters
+from app.services.seat_inventory import conflict_stats, get_inventory, occupied_seat_numbers
+from app.services.seat_template import seat_template_for
+
+
+def setup(threads: int, seat_count: int) -> tuple:
+    """Create one passenger per thread; returns flight id, contested seats and (user id, profile id) pairs"""
+    import seed_data
+    seed_data.seed_airports()
+    seed_data.seed_airplanes()
+    seed_data.seed_flights()
+
+    with SessionLocal() as db:
+        flight = db.query(Flight).filter(Flight.scheduled_departure > datetime.utcnow()).first()
+        passengers = []
+        for i in range(threads):
+            user = User(username=f"stress{i}", email=f"stress{i}@example.com",
+                        hashed_password="-", role="passenger")
+            db.add(user)
+            db.flush()
+            profile = PassengerProfile(user_id=user.id, full_name=f"Stress {i}",
+                                       email=f"stress{i}@example.com")
+            db.add(profile)
+            db.flush()
+            passengers.append((user.id, profile.id))
+        db.commit()
+        seats = [code for row in seat_template_for(flight.airplane).skeleton for code, _ in row][:seat_count]
+        return flight.id, seats, passengers
+
+
+def worker(flight_id, seats, passenger, attempts, cancel_ratio, outcomes, rng):
+    user_id, profile_id = passenger
+    with SessionLocal() as db:
+        for _ in range(attempts):
+            wanted = rng.sample(seats, rng.choice((1, 1, 2)))
+            try:
+                booking = create_booking(db, user_id, flight_id, [
+                    {"passenger_profile_id": profile_id, "seat_number": seat} for seat in wanted
+                ])
+                outcomes["booked"] += 1
+                if rng.random() < cancel_ratio:
+                    cancel_booking(db, booking.id)
+                    outcomes["cancelled"] += 1
+            except HTTPException as exc:
+                db.rollback()
+                outcomes[f"rejected {exc.status_code}"] += 1
+            except Exception as exc:
+                db.rollback()
+                outcomes[f"error {type(exc).__name__}"] += 1
+
+
+def check(flight_id: int) -> tuple:
+    """Seats with more than one active ticket, inventory/ticket mismatches and seat counter drift"""
+    with SessionLocal() as db:
+        oversold = db.query(Ticket.seat_number, func.count()).join(Booking).filter(
+            Booking.flight_id == flight_id,
+            Booking.status != BookingStatus.CANCELLED
+        ).group_by(Ticket.seat_number).having(func.count() > 1).all()
+        ticketed = {seat for (seat,) in db.query(Ticket.seat_number).join(Booking).filter(
+            Booking.flight_id == flight_id,
+            Booking.status != BookingStatus.CANCELLED
+        )}
+        flight = db.get(Flight, flight_id)
+        in_inventory = set(occupied_seat_numbers(flight, get_inventory(db, flight)))
+        counters_drifted = [entry for entry in verify_seat_counters(db) if entry["flight_id"] == flight_id]
+        return oversold, ticketed ^ in_inventory, counters_drifted, len(ticketed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--attempts", type=int, default=2000, help="Booking attempts in total")
+    parser.add_argument("--seats", type=int, default=24, help="Size of the contested seat pool")
+    parser.add_argument("--cancel-ratio", type=float, default=0.9,
+                        help="Share of successful bookings that are cancelled again")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    flight_id, seats, passengers = setup(args.threads, args.seats)
+    outcomes = Counter()
+    threads = [
+        threading.Thread(target=worker, args=(
+            flight_id, seats, passenger, args.attempts // args.threads, args.cancel_ratio,
+            outcomes, random.Random(args.seed + i)
+        ))
+        for i, passenger in enumerate(passengers)
+    ]
+
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    oversold, mismatched, counters_drifted, held = check(flight_id)
+    attempts = args.attempts // args.threads * args.threads
+    print(f"{attempts} booking attempts on {args.seats} seats from {args.threads} threads in {elapsed:.1f}s "
+          f"({attempts / elapsed:.0f} attempts/s)")
+    for outcome, count in sorted(outcomes.items()):
+        print(f"  {outcome}: {count}")
+    print(f"  inventory conflicts retried: {conflict_stats['conflicts']}, gave up: {conflict_stats['gave_up']}")
+    print(f"seats held at the end: {held}")
+    print(f"oversold seats: {len(oversold)}  inventory mismatches: {len(mismatched)}  "
+          f"seat counters: {counters_drifted[0] if counters_drifted else 'ok'}")
+    sys.exit(1 if oversold or mismatched or counters_drifted else 0)
+
+
+if __name__ == "__main__":
+    main()
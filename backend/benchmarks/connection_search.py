@@ -0,0 +1,111 @@
+"""
+Connection search latency on a generated flight network.
+
+Generates a dataset, loads the in-memory connection graph and times
+itinerary searches between random airport pairs, plus incremental graph
+updates for rescheduled flights. Two network shapes are preset:
+
+    sparse  50,000 flights between 150 airports over 30 days; most airport
+            pairs have few or no connections
+    dense   50,000 flights on 800 routes between 40 hub airports over 7 days;
+            every search has hundreds of candidate itineraries
+
+--airports, --routes and --days override the scenario's values.
+
+Usage (from the backend directory):
+    python benchmarks/connection_search.py --scenario dense --searches 2000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Point the app at a throwaway database before anything from app/ is imported
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+_db_dir = tempfile.mkdtemp(prefix="airline-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+
+from app.core.config import settings
+from app.core.database import SessionLocal, engine
+from app.models.airport import Airport
+from app.models.flight import Flight
+from app.services.connection_search import connection_graph
+
+
+SCENARIOS = {
+    "sparse": {"airports": 150, "routes": 3_000, "days": 30},
+    "dense": {"airports": 40, "routes": 800, "days": 7},
+}
+
+
+def percentiles(samples: list) -> str:
+    samples = sorted(samples)
+    p50 = statistics.median(samples) * 1000
+    p99 = samples[max(0, int(len(samples) * 0.99) - 1)] * 1000
+    return f"p50 {p50:6.2f} ms  p99 {p99:6.2f} ms  max {samples[-1] * 1000:6.2f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="sparse")
+    parser.add_argument("--flights", type=int, default=50_000)
+    parser.add_argument("--airports", type=int)
+    parser.add_argument("--routes", type=int)
+    parser.add_argument("--days", type=int)
+    parser.add_argument("--searches", type=int, default=2_000)
+    parser.add_argument("--max-legs", type=int, default=settings.CONNECTION_MAX_LEGS)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    for name, value in SCENARIOS[args.scenario].items():
+        if getattr(args, name) is None:
+            setattr(args, name, value)
+
+    from generate_dataset import generate_dataset
+    start_date = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    generate_dataset(engine, airports=args.airports, routes=args.routes, flights=args.flights,
+                     bookings=0, users=10, days=args.days, start_date=start_date)
+
+    with SessionLocal() as db:
+        started = time.perf_counter()
+        connection_graph.load(db)
+        print(f"graph of {connection_graph.stats()['flights']} flights loaded in "
+              f"{time.perf_counter() - started:.1f}s")
+        codes = [code for (code,) in db.query(Airport.code)]
+
+        rng = random.Random(args.seed)
+        first_day = (start_date - timedelta(days=args.days // 2)).date()
+        latencies, found = [], []
+        min_connection = timedelta(minutes=settings.CONNECTION_MIN_MINUTES)
+        max_connection = timedelta(minutes=settings.CONNECTION_MAX_MINUTES)
+        for _ in range(args.searches):
+            origin, destination = rng.sample(codes, 2)
+            day = first_day + timedelta(days=rng.randrange(args.days))
+            started = time.perf_counter()
+            itineraries = connection_graph.search(origin, destination, day, args.max_legs,
+                                                  min_connection, max_connection, settings.DEFAULT_PAGE_SIZE)
+            latencies.append(time.perf_counter() - started)
+            found.append(len(itineraries))
+        print(f"{args.searches} searches, up to {args.max_legs} legs: {percentiles(latencies)}")
+        print(f"itineraries per search: mean {statistics.mean(found):.1f}, "
+              f"{sum(1 for n in found if n) / len(found):.0%} of searches found one")
+
+        # Reschedule flights by an hour and apply them to the graph one by one
+        updates = []
+        for flight in db.query(Flight).order_by(Flight.id).limit(200):
+            flight.scheduled_departure += timedelta(hours=1)
+            flight.scheduled_arrival += timedelta(hours=1)
+            started = time.perf_counter()
+            connection_graph.upsert(db, flight)
+            updates.append(time.perf_counter() - started)
+        db.rollback()
+        print(f"incremental updates: {percentiles(updates)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Flight search latency while a login flood saturates the bcrypt pool.
+
+First measures authenticated flight search on its own, then again while a
+stream of concurrent logins runs in the background. With bcrypt on its own
+bounded pool, search p99 should stay close to the quiet baseline, and logins
+beyond the pool's queue get a fast 503 instead of waiting.
+
+Usage (from the backend directory):
+    python benchmarks/login_flood.py --requests 2000 --concurrency 50 --logins 400
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+# Point the app at a throwaway database before anything from app/ is imported
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+_db_dir = tempfile.mkdtemp(prefix="airline-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+
+import httpx
+from app.core.config import settings
+from app.core.database import async_engine
+from app.core.password_pool import password_pool
+from app.main import app
+
+API = settings.API_V1_PREFIX
+ADMIN = {"username": "admin", "password": "admin123"}
+
+
+def summarize(latencies: list, elapsed: float) -> str:
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1000
+    return f"{len(latencies) / elapsed:7.0f} req/s  p50 {p50:7.1f} ms  p99 {p99:7.1f} ms"
+
+
+async def search(client: httpx.AsyncClient, headers: dict, total: int, concurrency: int) -> str:
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.get(f"{API}/passenger/flights/search", headers=headers,
+                                        params={"origin": "JFK", "destination": "LAX"})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return summarize(latencies, time.perf_counter() - started)
+
+
+async def flood(client: httpx.AsyncClient, total: int, concurrency: int, outcomes: Counter) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            response = await client.post(f"{API}/auth/login", json=ADMIN)
+            outcomes[response.status_code] += 1
+
+    await asyncio.gather(*(one() for _ in range(total)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000, help="Search requests per phase")
+    parser.add_argument("--concurrency", type=int, default=50, help="Concurrent search requests")
+    parser.add_argument("--logins", type=int, default=400, help="Logins in the flood")
+    parser.add_argument("--login-concurrency", type=int, default=200)
+    args = parser.parse_args()
+
+    # seed_data works against DATABASE_URL; it provides the admin user and JFK -> LAX flights
+    import seed_data
+    seed_data.seed_airports()
+    seed_data.seed_airplanes()
+    seed_data.seed_flights()
+    seed_data.seed_admin_user()
+
+    async def compare():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            # Searches run as a passenger; the admin account is only used for the flood
+            await client.post(f"{API}/auth/register", json={
+                "username": "bench", "email": "bench@example.com", "password": "bench", "role": "passenger",
+            })
+            login = await client.post(f"{API}/auth/login", json={"username": "bench", "password": "bench"})
+            headers = {"Authorization": "Bearer " + login.json()["access_token"]}
+
+            print(f"bcrypt pool: {password_pool.workers} workers, queue {password_pool.max_queue}")
+            print(f"search, quiet:       {await search(client, headers, args.requests, args.concurrency)}")
+
+            outcomes = Counter()
+            flooding = asyncio.create_task(flood(client, args.logins, args.login_concurrency, outcomes))
+            print(f"search, login flood: {await search(client, headers, args.requests, args.concurrency)}")
+            await flooding
+
+            print("logins: " + ", ".join(f"{count} x {code}" for code, count in sorted(outcomes.items())))
+            stats = password_pool.stats()
+            print(f"bcrypt latency p50 {stats['latency_p50_ms']} ms  p99 {stats['latency_p99_ms']} ms")
+
+        password_pool.shutdown()
+        await async_engine.dispose()
+
+    asyncio.run(compare())
+
+
+if __name__ == "__main__":
+    main()
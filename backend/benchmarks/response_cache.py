@@ -0,0 +1,119 @@
+"""
+Flight search and details latency with and without the response cache.
+
+Generates a dataset, then replays the same read mix (route searches and
+flight details, popular routes and flights drawn from a Zipf distribution)
+with seat changes interleaved: every --write-every reads, a random flight of
+the mix gains a held seat and commits, which moves that flight's and its
+route's versions. The mix is replayed once per pool size (distinct requests)
+with the cache off and on, so the gain shows at several hit rates.
+
+Usage (from the backend directory):
+    python benchmarks/response_cache.py --flights 50000 --reads 5000 --pools 50,500,5000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Point the app at a throwaway database before anything from app/ is imported
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+_db_dir = tempfile.mkdtemp(prefix="airline-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+
+from app.core.config import settings
+from app.core.database import SessionLocal, engine
+from app.core.pagination import PageParams
+from app.models.flight import Flight
+from app.schemas.flight import FlightSearch
+from app.services.airport_index import airport_index
+from app.services.flight_search_index import flight_search_index
+from app.services.flight_service import details_cache, get_flight_details, search_cache, search_flights
+from app.services.seat_counters import adjust_seat_counters
+
+
+def build_pool(db, size: int, rng: random.Random) -> list:
+    """`size` distinct requests: route searches on a day, and flight details"""
+    codes = flight_search_index.airport_code
+    flights = db.query(
+        Flight.id, Flight.origin_id, Flight.destination_id, Flight.scheduled_departure
+    ).order_by(Flight.id).all()
+    pool = set()
+    while len(pool) < size:
+        flight_id, origin_id, destination_id, departure = rng.choice(flights)
+        if rng.random() < 0.5:
+            pool.add(("details", flight_id))
+        else:
+            day = datetime.combine(departure.date(), datetime.min.time())
+            pool.add(("search", flight_id, codes(origin_id), codes(destination_id), day))
+    return sorted(pool)
+
+
+def replay(db, pool: list, reads: int, write_every: int, seed: int) -> list:
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) ** 1.1 for rank in range(len(pool))]
+    requests = rng.choices(pool, weights, k=reads)
+    page = PageParams(cursor=None, limit=settings.DEFAULT_PAGE_SIZE)
+    latencies = []
+    for number, request in enumerate(requests, 1):
+        started = time.perf_counter()
+        if request[0] == "details":
+            get_flight_details(db, request[1])
+        else:
+            search_flights(db, FlightSearch(origin=request[2], destination=request[3], date=request[4]), page)
+        latencies.append(time.perf_counter() - started)
+        db.rollback()
+        if number % write_every == 0:
+            adjust_seat_counters(db, rng.choice(pool)[1], held=1)
+            db.commit()
+    return latencies
+
+
+def set_cache(enabled: bool) -> None:
+    for cache in (search_cache, details_cache):
+        cache.clear()
+        cache.hits = cache.misses = cache.evictions = 0
+        cache.maxsize = settings.RESPONSE_CACHE_MAX_SIZE if enabled else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--flights", type=int, default=50_000)
+    parser.add_argument("--reads", type=int, default=5_000)
+    parser.add_argument("--pools", default="50,500,5000", help="Comma-separated numbers of distinct requests")
+    parser.add_argument("--write-every", type=int, default=20, help="Reads between two seat changes")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    from generate_dataset import generate_dataset
+    generate_dataset(engine, flights=args.flights, bookings=args.flights, users=args.flights // 5,
+                     start_date=datetime.utcnow() - timedelta(days=1))
+
+    with SessionLocal() as db:
+        airport_index.load(db)
+        flight_search_index.load(db)
+        rng = random.Random(args.seed)
+        print(f"{args.reads} reads, a seat change every {args.write_every} reads")
+        for size in (int(size) for size in args.pools.split(",")):
+            pool = build_pool(db, size, rng)
+            results = {}
+            for enabled in (False, True):
+                set_cache(enabled)
+                results[enabled] = replay(db, pool, args.reads, args.write_every, args.seed)
+            hits = search_cache.hits + details_cache.hits
+            lookups = hits + search_cache.misses + details_cache.misses
+            off, on = (statistics.mean(results[enabled]) * 1000 for enabled in (False, True))
+            off_p50, on_p50 = (statistics.median(results[enabled]) * 1000 for enabled in (False, True))
+            print(f"pool {size:>6}: hit rate {hits / lookups:5.1%}  "
+                  f"mean {off:6.3f} -> {on:6.3f} ms ({off / on:4.1f}x)  "
+                  f"p50 {off_p50:6.3f} -> {on_p50:6.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
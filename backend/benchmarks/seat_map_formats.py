@@ -0,0 +1,89 @@
+"""
+Seat map payload size and serialization time per wire format.
+
+Builds the seat map of a 378-seat flight (about half its seats taken) in each
+format, serializes it the way the API does, and reports the JSON size (raw
+and gzipped) together with the time spent building and serializing it.
+
+Usage (from the backend directory):
+    python benchmarks/seat_map_formats.py --iterations 2000
+"""
+import argparse
+import gzip
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Point the app at a throwaway database before anything from app/ is imported
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+_db_dir = tempfile.mkdtemp(prefix="airline-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.core.database import SessionLocal
+from app.models.airplane import Airplane
+from app.models.flight import Flight
+from app.schemas.flight import SeatMapFormat
+from app.services.flight_service import get_seat_map
+from app.services.seat_inventory import rebuild_inventory
+from app.services.seat_template import seat_template_for
+
+
+def setup(occupancy: float, seed: int) -> int:
+    """Id of a flight moved onto the largest aircraft, with `occupancy` of its seats taken"""
+    import seed_data
+    seed_data.seed_airports()
+    seed_data.seed_airplanes()
+    seed_data.seed_flights()
+
+    with SessionLocal() as db:
+        flight = db.query(Flight).order_by(Flight.id).first()
+        flight.airplane = db.query(Airplane).order_by(Airplane.total_seats.desc()).first()
+        template = seat_template_for(flight.airplane)
+        inventory = rebuild_inventory(db, flight)
+        rng = random.Random(seed)
+        bitmap = bytearray(inventory.bitmap)
+        for index in rng.sample(sorted(template.index_of.values()), int(template.seat_count * occupancy)):
+            bitmap[index >> 3] |= 1 << (index & 7)
+        inventory.bitmap = bytes(bitmap)
+        db.commit()
+        print(f"{flight.airplane.model}: {template.seat_count} seats, {int(template.seat_count * occupancy)} taken")
+        return flight.id
+
+
+def measure(flight_id: int, seat_map_format: SeatMapFormat, iterations: int) -> tuple:
+    build = serialize = 0.0
+    with SessionLocal() as db:
+        for _ in range(iterations):
+            started = time.perf_counter()
+            seat_map = get_seat_map(db, flight_id, seat_map_format)
+            built = time.perf_counter()
+            # What the endpoint does with a returned dict
+            body = JSONResponse(jsonable_encoder(seat_map)).body
+            serialize += time.perf_counter() - built
+            build += built - started
+            db.expire_all()
+    return len(body), len(gzip.compress(body)), build / iterations * 1000, serialize / iterations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--occupancy", type=float, default=0.5, help="Share of seats taken")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    flight_id = setup(args.occupancy, args.seed)
+    print(f"{'format':8} {'bytes':>7} {'gzipped':>8} {'build ms':>9} {'serialize ms':>13}")
+    for seat_map_format in SeatMapFormat:
+        size, gzipped, build_ms, serialize_ms = measure(flight_id, seat_map_format, args.iterations)
+        print(f"{seat_map_format.value:8} {size:7d} {gzipped:8d} {build_ms:9.3f} {serialize_ms:13.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Thundering herd on one flight, with and without request coalescing.
+
+Simulates an announcement going out: before each round the flight's version
+moves (as a booking would), so nothing is cached, then --herd passengers
+request its details and seat map at the same moment. Database queries are
+counted at the engine for each round. Requests are driven in-process through
+httpx's ASGI transport.
+
+Usage (from the backend directory):
+    python benchmarks/thundering_herd.py --herd 500 --rounds 10
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Point the app at a throwaway database before anything from app/ is imported
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+_db_dir = tempfile.mkdtemp(prefix="airline-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import async_engine, get_async_db
+from app.services.flight_service import get_flight_details_async, get_seat_map_async, hot_reads
+from app.services.resource_versions import touch
+
+queries = 0
+
+
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    global queries
+    queries += 1
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/flights/{flight_id}")
+    async def details(flight_id: int, db: AsyncSession = Depends(get_async_db)):
+        return await get_flight_details_async(db, flight_id)
+
+    @app.get("/flights/{flight_id}/seat-map")
+    async def seat_map(flight_id: int, db: AsyncSession = Depends(get_async_db)):
+        return await get_seat_map_async(db, flight_id)
+
+    return app
+
+
+async def herd(client: httpx.AsyncClient, flight_id: int, size: int) -> list:
+    latencies = []
+
+    async def one(path: str):
+        started = time.perf_counter()
+        response = await client.get(path)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+
+    paths = [f"/flights/{flight_id}", f"/flights/{flight_id}/seat-map"]
+    await asyncio.gather(*(one(paths[number % 2]) for number in range(size)))
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--herd", type=int, default=500, help="Concurrent requests per round")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--flight-id", type=int, default=1)
+    args = parser.parse_args()
+
+    # seed_data creates the tables and works against DATABASE_URL on import
+    import seed_data
+    seed_data.seed_airports()
+    seed_data.seed_airplanes()
+    seed_data.seed_flights()
+
+    app = build_app()
+
+    async def compare():
+        global queries
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for coalescing in (False, True):
+                settings.REQUEST_COALESCING = coalescing
+                hot_reads.leaders = hot_reads.collapsed = 0
+                counts, latencies = [], []
+                for _ in range(args.rounds):
+                    touch(None, ("flight", args.flight_id))
+                    queries = 0
+                    latencies += await herd(client, args.flight_id, args.herd)
+                    counts.append(queries)
+                latencies.sort()
+                print(
+                    f"coalescing {'on ' if coalescing else 'off'}: "
+                    f"{statistics.mean(counts):7.1f} queries per herd of {args.herd}  "
+                    f"p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+                    f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:7.1f} ms  "
+                    f"collapsed {hot_reads.collapsed}"
+                )
+        await async_engine.dispose()
+
+    asyncio.run(compare())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Query plan regression check.
+
+Drives the passenger and staff API against a scratch database, records every
+SELECT the services issue and runs EXPLAIN QUERY PLAN on each of them. Exits
+with a non-zero status if any query falls back to a full table scan.
+
+Usage (from the backend directory):
+    python check_query_plans.py
+"""
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add the project root to Python path and use a throwaway database
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+_db_dir = tempfile.mkdtemp(prefix="airline-plans-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/plans.db"
+# Searches must reach SQLite to have their plans checked
+os.environ["FLIGHT_SEARCH_INDEX"] = "false"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+import seed_data
+from app.core.config import settings
+from app.core.database import Base, engine, async_engine
+from app.core.security import create_access_token
+from app.main import app
+
+API = settings.API_V1_PREFIX
+
+# "SCAN flights" / "SCAN TABLE flights" (older SQLite), optionally "USING INDEX ..."
+FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: USING (?:COVERING )?INDEX (\w+))?")
+
+# A scan of a partial index only visits the rows its WHERE clause keeps
+PARTIAL_INDEXES = {
+    index.name
+    for table in Base.metadata.tables.values()
+    for index in table.indexes
+    if index.dialect_options["sqlite"]["where"] is not None
+}
+
+recorded = {}  # statement -> (label, parameters) of the first call that issued it
+current_label = None
+
+
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def _record_select(conn, cursor, statement, parameters, context, executemany):
+    if current_label and statement.lstrip().upper().startswith("SELECT"):
+        recorded.setdefault(statement, (current_label, parameters))
+
+
+def _is_full_scan(detail: str) -> bool:
+    match = FULL_SCAN.match(detail)
+    return bool(match) and match.group(2) not in PARTIAL_INDEXES
+
+
+def call(client: TestClient, label: str, method: str, path: str, **kwargs):
+    global current_label
+    current_label = label
+    try:
+        response = client.request(method, API + path, **kwargs)
+    finally:
+        current_label = None
+    if response.status_code >= 400:
+        raise SystemExit(f"{label}: {method} {path} -> {response.status_code} {response.text}")
+    return response.json()
+
+
+def exercise(client: TestClient) -> None:
+    def register(username: str, role: str) -> dict:
+        user = call(client, "register", "POST", "/auth/register", json={
+            "username": username, "email": f"{username}@example.com",
+            "password": "secret", "role": role,
+        })
+        return {"Authorization": "Bearer " + create_access_token({"sub": str(user["id"])})}
+
+    passenger = register("plan_passenger", "passenger")
+    staff = register("plan_staff", "staff")
+    call(client, "login", "POST", "/auth/login", json={"username": "plan_passenger", "password": "secret"})
+    profile = call(client, "create profile", "POST", "/auth/profile", headers=passenger,
+                   json={"full_name": "Plan Passenger", "email": "plan@example.com"})
+    call(client, "get profile", "GET", "/auth/profile", headers=passenger)
+
+    tomorrow = (datetime.utcnow() + timedelta(days=1)).strftime("%Y-%m-%d")
+    flights = call(client, "search flights", "GET", "/passenger/flights/search", headers=passenger,
+                   params={"origin": "JFK", "destination": "LAX", "date": tomorrow})
+    flight_id = flights[0]["id"]
+    call(client, "flight calendar", "GET", "/passenger/flights/calendar", headers=passenger,
+         params={"origin": "JFK", "destination": "LAX", "date": tomorrow})
+    for sort in ("duration", "seats_left"):
+        call(client, f"search flights by {sort}", "GET", "/passenger/flights/search", headers=passenger,
+             params={"origin": "JFK", "destination": "LAX", "sort": sort})
+
+    # A flight inside the check-in window
+    departure = datetime.utcnow() + timedelta(hours=5)
+    soon = call(client, "create flight", "POST", "/staff/flights", headers=staff, json={
+        "flight_number": "PLAN1", "origin_id": flights[0]["origin_id"],
+        "destination_id": flights[0]["destination_id"], "airplane_id": flights[0]["airplane_id"],
+        "scheduled_departure": departure.isoformat(),
+        "scheduled_arrival": (departure + timedelta(hours=6)).isoformat(),
+    })
+    call(client, "update flight", "PUT", f"/staff/flights/{soon['id']}", headers=staff, json={"gate": "P1"})
+    call(client, "get flight", "GET", f"/staff/flights/{soon['id']}", headers=staff)
+
+    call(client, "flight details", "GET", f"/passenger/flights/{flight_id}", headers=passenger)
+    call(client, "seat map", "GET", f"/passenger/flights/{flight_id}/seat-map", headers=passenger)
+
+    booking = call(client, "create booking", "POST", "/passenger/bookings", headers=passenger, json={
+        "flight_id": soon["id"],
+        "passenger_profiles": [{"passenger_profile_id": profile["id"], "seat_number": "3C"}],
+    })
+    call(client, "payment", "POST", "/passenger/payments", headers=passenger,
+         json={"booking_id": booking["id"], "transaction_id": "plan-txn-1"})
+    call(client, "check-in", "POST", f"/passenger/check-in/{booking['tickets'][0]['id']}", headers=passenger)
+    call(client, "reassign seat", "PUT", f"/staff/bookings/{booking['id']}/reassign-seat", headers=staff,
+         params={"ticket_id": booking["tickets"][0]["id"], "new_seat": "4D"})
+
+    call(client, "create announcement", "POST", "/staff/announcements", headers=staff,
+         json={"flight_id": soon["id"], "announcement_type": "GATE_CHANGE", "message": "Now at P2"})
+    call(client, "announcements", "GET", "/passenger/announcements", headers=passenger)
+    call(client, "announcements since", "GET", "/passenger/announcements", headers=passenger, params={"since": 0})
+    call(client, "upcoming trips", "GET", "/passenger/bookings/upcoming", headers=passenger)
+    call(client, "past trips", "GET", "/passenger/bookings/past", headers=passenger)
+    call(client, "bookings by flight", "GET", "/staff/bookings", headers=staff, params={"flight_id": soon["id"]})
+
+    second = call(client, "create booking", "POST", "/passenger/bookings", headers=passenger, json={
+        "flight_id": flight_id,
+        "passenger_profiles": [{"passenger_profile_id": profile["id"], "seat_number": "5A"}],
+    })
+    call(client, "cancel booking", "POST", f"/staff/bookings/{second['id']}/cancel", headers=staff)
+
+
+def main():
+    seed_data.seed_airports()
+    seed_data.seed_airplanes()
+    seed_data.seed_flights()
+
+    with TestClient(app) as client:
+        exercise(client)
+
+    failures = 0
+    with engine.connect() as conn:
+        for statement, (label, parameters) in recorded.items():
+            plan = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+            scans = [row[3] for row in plan if _is_full_scan(row[3])]
+            if scans:
+                failures += 1
+                print(f"[FAIL] {label}: {'; '.join(scans)}")
+                print("       " + " ".join(statement.split()))
+            else:
+                print(f"[OK]   {label}: {'; '.join(row[3] for row in plan)}")
+
+    print(f"\n{len(recorded)} queries checked, {failures} full table scan(s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+"""
+Synthetic dataset generator for load and scale testing.
+
+Builds a deterministic dataset from a seed: airports, airplanes, flights,
+passengers, bookings, tickets, payments, check-ins and seat inventories. Rows
+are written as plain tuples with batched executemany inserts and explicit
+primary keys, and secondary indexes are built once after loading, so no
+per-row round trips or existence checks are needed. The same seed, sizes and
+start date always produce the same data.
+
+Usage (from the backend directory):
+    python generate_dataset.py --database-url sqlite:///./load.db --flights 1000000 --bookings 1000000
+
+It can also be imported and used as a benchmark fixture:
+    from generate_dataset import generate_dataset
+    summary = generate_dataset(engine, flights=50_000, bookings=50_000)
+"""
+import argparse
+import json
+import random
+import string
+import sys
+import time
+from array import array
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from app.core.database import Base
+from app.core.migrations import upgrade_schema
+from app.core.security import get_password_hash
+from app.models.airport import Airport
+from app.models.airplane import Airplane
+from app.models.flight import Flight, FlightStatus
+from app.models.user import User
+from app.models.passenger_profile import PassengerProfile
+from app.models.booking import Booking, BookingStatus
+from app.models.ticket import Ticket
+from app.models.payment import Payment, PaymentStatus, PaymentMethod
+from app.models.checkin import CheckIn
+from app.models.seat_inventory import SeatInventory
+from app.services.seat_counters import reset_seat_counters
+from app.services.seat_template import compile_seat_template
+
+BATCH_SIZE = 20_000
+
+# Real airports first, so the usual codes (JFK, LAX, ...) exist in every dataset
+KNOWN_AIRPORTS = [
+    ("JFK", "John F. Kennedy International Airport", "New York", "USA"),
+    ("LAX", "Los Angeles International Airport", "Los Angeles", "USA"),
+    ("LHR", "Heathrow Airport", "London", "UK"),
+    ("CDG", "Charles de Gaulle Airport", "Paris", "France"),
+    ("DXB", "Dubai International Airport", "Dubai", "UAE"),
+    ("SIN", "Singapore Changi Airport", "Singapore", "Singapore"),
+    ("NRT", "Narita International Airport", "Tokyo", "Japan"),
+    ("SYD", "Sydney Kingsford Smith Airport", "Sydney", "Australia"),
+]
+
+AIRPLANE_MODELS = [
+    ("Boeing 737-800", {"rows": 30, "seats_per_row": 6, "layout": "3-3"}),
+    ("Airbus A320", {"rows": 28, "seats_per_row": 6, "layout": "3-3"}),
+    ("Boeing 777-300ER", {"rows": 42, "seats_per_row": 9, "layout": "3-3-3"}),
+    ("Airbus A350", {"rows": 40, "seats_per_row": 9, "layout": "3-3-3"}),
+]
+
+COUNTRIES = ["USA", "UK", "France", "Germany", "UAE", "Singapore", "Japan", "Australia", "Brazil", "India"]
+
+
+def _insert(conn, table, columns: tuple, rows: list) -> None:
+    """executemany straight to the driver; values must already be in their stored form"""
+    statement = f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    for start in range(0, len(rows), BATCH_SIZE):
+        conn.exec_driver_sql(statement, rows[start:start + BATCH_SIZE])
+
+
+def _ts(value: datetime) -> str:
+    # Same text format SQLAlchemy's SQLite DateTime type writes, so comparisons match
+    return value.isoformat(" ", "microseconds")
+
+
+AIRPORT_COLUMNS = ("id", "code", "name", "city", "country")
+AIRPLANE_COLUMNS = ("id", "model", "registration_number", "seat_template", "total_seats")
+FLIGHT_COLUMNS = ("id", "flight_number", "origin_id", "destination_id", "airplane_id", "scheduled_departure",
+                  "scheduled_arrival", "gate", "terminal", "status", "created_at")
+USER_COLUMNS = ("id", "username", "email", "hashed_password", "role", "is_active", "created_at")
+PROFILE_COLUMNS = ("id", "user_id", "full_name", "email", "nationality", "passport_number")
+BOOKING_COLUMNS = ("id", "pnr", "user_id", "flight_id", "status", "seat_hold_expires_at", "created_at")
+TICKET_COLUMNS = ("id", "ticket_number", "booking_id", "passenger_profile_id", "seat_number")
+PAYMENT_COLUMNS = ("id", "booking_id", "amount", "payment_method", "status", "transaction_id", "created_at")
+CHECKIN_COLUMNS = ("id", "ticket_id", "qr_code", "checked_in_at")
+INVENTORY_COLUMNS = ("flight_id", "seat_count", "bitmap")
+
+BULK_TABLES = [Airport, Airplane, Flight, User, PassengerProfile, Booking, Ticket, Payment, CheckIn]
+
+
+def _airport_codes(rng: random.Random, count: int) -> list:
+    codes = [code for code, _, _, _ in KNOWN_AIRPORTS[:count]]
+    taken = set(codes)
+    while len(codes) < count:
+        code = "".join(rng.choices(string.ascii_uppercase, k=3))
+        if code not in taken:
+            taken.add(code)
+            codes.append(code)
+    return codes
+
+
+def _base36(value: int, width: int) -> str:
+    digits = string.digits + string.ascii_uppercase
+    out = []
+    while value:
+        value, rem = divmod(value, 36)
+        out.append(digits[rem])
+    return "".join(reversed(out)).rjust(width, "0")
+
+
+def generate_dataset(
+    engine: Engine,
+    seed: int = 42,
+    airports: int = 2_000,
+    airplanes: int = 1_000,
+    routes: int = 10_000,
+    flights: int = 100_000,
+    users: int = 50_000,
+    bookings: int = 100_000,
+    start_date: datetime = None,
+    days: int = 60,
+    reset: bool = False,
+) -> dict:
+    """Populate an empty database and return the number of rows written per table"""
+    if airports > 17_576:
+        raise ValueError("At most 17,576 airports (three-letter codes) are supported")
+    rng = random.Random(seed)
+    start_date = (start_date or datetime.utcnow()).replace(hour=0, minute=0, second=0, microsecond=0)
+    # Half the schedule lies in the past, so there are past trips and check-ins too
+    first_day = start_date - timedelta(days=days // 2)
+    now = datetime.utcnow()
+    counts = {}
+
+    if reset:
+        Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
+
+    with engine.begin() as conn:
+        if conn.exec_driver_sql("SELECT EXISTS (SELECT 1 FROM flights)").scalar():
+            raise RuntimeError("Database already contains data; use reset=True / --reset to rebuild it")
+        # Durability is pointless while building a throwaway dataset
+        conn.exec_driver_sql("PRAGMA synchronous = OFF")
+        indexes = [index for model in BULK_TABLES for index in model.__table__.indexes]
+        for index in indexes:
+            index.drop(bind=conn)
+
+        # Airports
+        codes = _airport_codes(rng, airports)
+        rows = []
+        for i, code in enumerate(codes):
+            if i < len(KNOWN_AIRPORTS):
+                _, name, city, country = KNOWN_AIRPORTS[i]
+            else:
+                city = f"{code.title()} City"
+                name, country = f"{city} International Airport", rng.choice(COUNTRIES)
+            rows.append((i + 1, code, name, city, country))
+        _insert(conn, Airport.__table__, AIRPORT_COLUMNS, rows)
+        counts["airports"] = len(rows)
+
+        # Airplanes
+        rows, capacities, templates = [], [], []
+        for i in range(airplanes):
+            model, template = AIRPLANE_MODELS[rng.randrange(len(AIRPLANE_MODELS))]
+            capacity = template["rows"] * template["seats_per_row"]
+            rows.append((i + 1, model, f"N{i + 1:05d}G", json.dumps(template), capacity))
+            capacities.append(capacity)
+            templates.append(compile_seat_template(template))
+        _insert(conn, Airplane.__table__, AIRPLANE_COLUMNS, rows)
+        counts["airplanes"] = len(rows)
+
+        # Flights, spread over a fixed set of routes and the schedule window
+        route_pairs = []
+        for _ in range(routes):
+            origin = rng.randrange(airports)
+            destination = rng.randrange(airports - 1)
+            if destination >= origin:
+                destination += 1
+            route_pairs.append((origin + 1, destination + 1, rng.randint(60, 900)))
+
+        flight_airplane = array("I")
+        flight_departure = []
+        rows = []
+        created = _ts(first_day)
+        slots = days * 24 * 12  # Departures on a 5 minute grid
+        for i in range(flights):
+            origin_id, destination_id, minutes = route_pairs[int(rng.random() * routes)]
+            airplane_index = int(rng.random() * airplanes)
+            departure = first_day + timedelta(minutes=int(rng.random() * slots) * 5)
+            rows.append((
+                i + 1, f"GX{i + 1}", origin_id, destination_id, airplane_index + 1,
+                _ts(departure), _ts(departure + timedelta(minutes=minutes)),
+                f"{'ABCDE'[i % 5]}{i % 40 + 1}", str(i % 5 + 1),
+                FlightStatus.ARRIVED.name if departure < now else FlightStatus.SCHEDULED.name,
+                created,
+            ))
+            flight_airplane.append(airplane_index)
+            flight_departure.append(departure)
+            if len(rows) == BATCH_SIZE:
+                _insert(conn, Flight.__table__, FLIGHT_COLUMNS, rows)
+                rows = []
+        _insert(conn, Flight.__table__, FLIGHT_COLUMNS, rows)
+        counts["flights"] = flights
+
+        # Users with a passenger profile each; user 1 is the staff admin from seed_data.py
+        password_hash = get_password_hash("password")
+        user_rows = [(1, "admin", "admin@airline.com", get_password_hash("admin123"), "staff", True, created)]
+        profile_rows = []
+        for user_id in range(2, users + 2):
+            email = f"passenger{user_id}@example.com"
+            user_rows.append((user_id, f"passenger{user_id}", email, password_hash, "passenger", True, created))
+            profile_rows.append((
+                user_id - 1, user_id, f"Passenger {user_id}", email,
+                COUNTRIES[user_id % len(COUNTRIES)], f"P{user_id:08d}",
+            ))
+        _insert(conn, User.__table__, USER_COLUMNS, user_rows)
+        _insert(conn, PassengerProfile.__table__, PROFILE_COLUMNS, profile_rows)
+        counts["users"], counts["passenger_profiles"] = len(user_rows), len(profile_rows)
+        del user_rows, profile_rows
+
+        # Bookings take seats front to back, so no seat is ever sold twice
+        next_seat = array("H", bytes(2 * flights))
+        occupied = {}
+        booking_rows, ticket_rows, payment_rows, checkin_rows = [], [], [], []
+        ticket_id = 0
+        written = {"bookings": 0, "tickets": 0, "payments": 0, "checkins": 0}
+
+        def flush():
+            _insert(conn, Booking.__table__, BOOKING_COLUMNS, booking_rows)
+            _insert(conn, Ticket.__table__, TICKET_COLUMNS, ticket_rows)
+            _insert(conn, Payment.__table__, PAYMENT_COLUMNS, payment_rows)
+            _insert(conn, CheckIn.__table__, CHECKIN_COLUMNS, checkin_rows)
+            written["bookings"] += len(booking_rows)
+            written["tickets"] += len(ticket_rows)
+            written["payments"] += len(payment_rows)
+            written["checkins"] += len(checkin_rows)
+            for rows in (booking_rows, ticket_rows, payment_rows, checkin_rows):
+                rows.clear()
+
+        for booking_id in range(1, bookings + 1):
+            flight_index = int(rng.random() * flights)
+            seats = (1, 1, 1, 2, 2, 3)[int(rng.random() * 6)]
+            first_seat = next_seat[flight_index]
+            if first_seat + seats > capacities[flight_airplane[flight_index]]:
+                continue
+            next_seat[flight_index] = first_seat + seats
+
+            user_id = 2 + int(rng.random() * users)
+            departure = flight_departure[flight_index]
+            created_at = departure - timedelta(hours=1 + int(rng.random() * 720))
+            booked = _ts(created_at)
+            roll = rng.random()
+            if roll < 0.8:
+                booking_status = BookingStatus.CONFIRMED
+            elif roll < 0.9:
+                booking_status = BookingStatus.CANCELLED
+            else:
+                booking_status = BookingStatus.CREATED
+
+            booking_rows.append((
+                booking_id, _base36(booking_id, 6), user_id, flight_index + 1, booking_status.name,
+                _ts(created_at + timedelta(minutes=10)), booked,
+            ))
+            if booking_status == BookingStatus.CONFIRMED:
+                payment_rows.append((
+                    booking_id, booking_id, seats * 100.0, PaymentMethod.CARD.name,
+                    PaymentStatus.PAID.name, f"GEN-{booking_id}", booked,
+                ))
+
+            template = templates[flight_airplane[flight_index]]
+            for seat in range(first_seat, first_seat + seats):
+                ticket_id += 1
+                ticket_number = f"T{ticket_id:09d}"
+                seat_number = template.codes[seat]
+                ticket_rows.append((ticket_id, ticket_number, booking_id, user_id - 1, seat_number))
+                if booking_status == BookingStatus.CANCELLED:
+                    continue
+                occupied.setdefault(flight_index, []).append(seat)
+                if booking_status == BookingStatus.CONFIRMED and departure < now:
+                    checkin_rows.append((
+                        ticket_id, ticket_id,
+                        f'{{"ticket_number": "{ticket_number}", "seat": "{seat_number}"}}',
+                        _ts(departure - timedelta(hours=2 + ticket_id % 20)),
+                    ))
+
+            if len(booking_rows) >= BATCH_SIZE:
+                flush()
+        flush()
+        counts.update(written)
+
+        # One seat bitmap per flight
+        rows = []
+        for flight_index in range(flights):
+            template = templates[flight_airplane[flight_index]]
+            seat_count = template.slot_count
+            bitmap = bytearray((seat_count + 7) // 8)
+            for seat in occupied.get(flight_index, ()):
+                bitmap[seat >> 3] |= 1 << (seat & 7)
+            rows.append((flight_index + 1, seat_count, bytes(bitmap)))
+            if len(rows) == BATCH_SIZE:
+                _insert(conn, SeatInventory.__table__, INVENTORY_COLUMNS, rows)
+                rows = []
+        _insert(conn, SeatInventory.__table__, INVENTORY_COLUMNS, rows)
+        counts["seat_inventories"] = flights
+
+        # Build the secondary indexes in one pass each instead of row by row
+        for index in indexes:
+            index.create(bind=conn)
+        reset_seat_counters(conn)
+
+    with engine.connect() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic airline dataset")
+    parser.add_argument("--database-url", default="sqlite:///./load.db")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--airports", type=int, default=2_000)
+    parser.add_argument("--airplanes", type=int, default=1_000)
+    parser.add_argument("--routes", type=int, default=10_000)
+    parser.add_argument("--flights", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=200_000)
+    parser.add_argument("--bookings", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=60, help="Length of the flight schedule, centred on the start date")
+    parser.add_argument("--start-date", type=datetime.fromisoformat, default=None,
+                        help="Centre of the schedule (YYYY-MM-DD); defaults to today")
+    parser.add_argument("--reset", action="store_true", help="Drop all tables before generating")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    started = time.perf_counter()
+    counts = generate_dataset(
+        engine,
+        seed=args.seed,
+        airports=args.airports,
+        airplanes=args.airplanes,
+        routes=args.routes,
+        flights=args.flights,
+        users=args.users,
+        bookings=args.bookings,
+        start_date=args.start_date,
+        days=args.days,
+        reset=args.reset,
+    )
+    elapsed = time.perf_counter() - started
+    for table, count in counts.items():
+        print(f"[OK] {table}: {count:,}")
+    print(f"\nGenerated {sum(counts.values()):,} rows in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
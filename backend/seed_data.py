@@ -11,15 +11,18 @@ sys.path.insert(0, str(project_root))
 
 from sqlalchemy.orm import Session
 from app.core.database import SessionLocal, engine, Base
+from app.core.migrations import upgrade_schema
 from app.models.airport import Airport
 from app.models.airplane import Airplane
 from app.models.flight import Flight, FlightStatus
 from app.models.user import User
 from app.core.security import get_password_hash
+from app.services.seat_counters import reset_seat_counters
 from datetime import datetime, timedelta
 
 # Create tables
 Base.metadata.create_all(bind=engine)
+upgrade_schema(engine)
 
 db: Session = SessionLocal()
 
@@ -158,6 +161,8 @@ def seed_flights():
             flight = Flight(**flight_data)
             db.add(flight)
     
+    db.flush()
+    reset_seat_counters(db)
     db.commit()
     print("[OK] Flights seeded")
 
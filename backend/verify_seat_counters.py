@@ -0,0 +1,55 @@
+"""
+Seat counter verification.
+
+Recomputes every flight's held/booked/available seat counters from its tickets
+and reports flights whose stored counters differ. With --repair, drifted
+flights are recomputed in place. Exits with a non-zero status if drift was
+found (and not repaired).
+
+Usage (from the backend directory):
+    python verify_seat_counters.py [--repair] [--database-url sqlite:///./load.db]
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify (and repair) the seat counters on flights")
+    parser.add_argument("--repair", action="store_true", help="Recompute the counters of drifted flights")
+    parser.add_argument("--database-url", help="Defaults to the app's DATABASE_URL")
+    parser.add_argument("--show", type=int, default=20, help="Drifted flights to list")
+    args = parser.parse_args()
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+
+    from app.core.database import Base, SessionLocal, engine
+    from app.core.migrations import upgrade_schema
+    from app.models.flight import Flight
+    from app.services.seat_counters import verify_seat_counters
+
+    Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        drifted = verify_seat_counters(db, repair=args.repair)
+        checked = db.query(Flight).count()
+    elapsed = time.perf_counter() - started
+
+    for entry in drifted[:args.show]:
+        print(f"flight {entry['flight_id']}: stored {entry['stored']}, expected {entry['expected']}")
+    if len(drifted) > args.show:
+        print(f"... and {len(drifted) - args.show} more")
+    action = "repaired" if args.repair else "found"
+    print(f"{len(drifted)} of {checked} flight(s) with drifted seat counters {action} in {elapsed:.1f}s")
+    sys.exit(1 if drifted and not args.repair else 0)
+
+
+if __name__ == "__main__":
+    main()